@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Flowy进程内缓存模块"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """线程安全的TTL缓存
+
+    条目在写入 ttl 秒后过期；超过 maxsize 时淘汰最早写入的条目。
+    仅在当前进程内有效，多进程部署时各进程独立缓存。
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # 每次删除条目时递增，用于判断读取数据期间缓存是否被失效过
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """当前失效代数，在读取数据源之前获取，写入时传给 set_if_current"""
+        return self._generation
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值，不存在或已过期时返回 default"""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """写入缓存值"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set_if_current(self, key: Hashable, value: Any, generation: int) -> bool:
+        """仅当自 generation 以来没有发生过失效时写入缓存值
+
+        避免读取数据源期间其他线程修改并失效了缓存，随后又写回修改前的旧值
+
+        Returns:
+            是否已写入
+        """
+        with self._lock:
+            if self._generation != generation:
+                return False
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """删除并返回缓存值"""
+        with self._lock:
+            self._generation += 1
+            item = self._data.pop(key, _MISSING)
+            return default if item is _MISSING else item[1]
+
+    def evict(self, predicate: Callable[[Hashable], bool]) -> int:
+        """删除所有键满足 predicate 的条目
+
+        Returns:
+            删除的条目数量
+        """
+        with self._lock:
+            self._generation += 1
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+
+class RunningGauge:
+    """运行中Flow数量计数器
+
+    由Flow执行生命周期增减；首次读取及每隔 resync_interval 秒通过 loader
+    从数据库重新统计，以修正其他进程执行或异常退出造成的偏差。
+    """
+
+    def __init__(self, resync_interval: float = 60):
+        self.resync_interval = resync_interval
+        self._value = 0
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def incr(self, n: int = 1) -> None:
+        """增加计数"""
+        with self._lock:
+            self._value += n
+
+    def decr(self, n: int = 1) -> None:
+        """减少计数"""
+        with self._lock:
+            self._value = max(0, self._value - n)
+
+    def get(self, loader: Callable[[], int]) -> int:
+        """获取当前计数，需要同步时调用 loader 读取数据库"""
+        with self._lock:
+            if self._synced_at is not None and time.monotonic() - self._synced_at < self.resync_interval:
+                return self._value
+        value = loader()
+        with self._lock:
+            self._value = value
+            self._synced_at = time.monotonic()
+            return value
+
+
+# Flow图表数据缓存，键为 (flow_id, days, 窗口基准时间)
+chart_cache = TTLCache(maxsize=512, ttl=15)
+
+# 侧边栏所有Flow的统计数据，键固定为 'all'
+flow_stats_cache = TTLCache(maxsize=1, ttl=15)
+
+# 触发器快照缓存，键为 trigger_id
+trigger_cache = TTLCache(maxsize=1024, ttl=60)
+
+# 触发器详情缓存，键为 trigger_id，值为不可变的 TriggerDetail 快照
+trigger_detail_cache = TTLCache(maxsize=512, ttl=60)
+
+# 运行中Flow数量
+running_gauge = RunningGauge(resync_interval=60)
+
+
+def invalidate_flow_caches(flow_id: Optional[str] = None, refresh_stats: bool = True) -> None:
+    """使指定Flow的缓存失效
+
+    侧边栏统计包含所有Flow，注册Flow或删除历史时需一并失效；执行开始、结束等状态变化
+    非常频繁，传入 refresh_stats=False 只清除图表缓存，侧边栏计数最多延迟一个TTL周期
+
+    Args:
+        flow_id: 工作流ID，为 None 时清空所有Flow的缓存
+        refresh_stats: 是否同时清除侧边栏统计缓存
+    """
+    if refresh_stats:
+        flow_stats_cache.clear()
+    if flow_id is None:
+        chart_cache.clear()
+    else:
+        chart_cache.evict(lambda key: key[0] == flow_id)
@@ -16,10 +16,20 @@ class FlowyConfig:
     # 历史数据清理配置
     enable_history_cleanup: bool = False  # 是否启用历史数据自动清理，默认关闭
     history_retention_days: int = 60  # 历史数据保留天数，默认60天
+    history_cleanup_batch_size: int = 10000  # 清理时每个事务删除的 FlowHistory 条数
 
     # 调度器配置
-    scheduler_max_workers: int = 10  # 调度器线程池最大工作线程数
-    scheduler_timezone: str = 'Asia/Shanghai'  # 调度器时区
+    # 调度器线程池最大工作线程数，Flow 以 IO 等待为主，默认按 CPU 核数的4倍，最多32
+    scheduler_max_workers: int = field(default_factory=lambda: min(32, (os.cpu_count() or 1) * 4))
+    # 调度器时区，触发器的 cron 表达式按该时区解析；默认 None 使用主机本地时区
+    scheduler_timezone: Optional[str] = None
+    # 无需延迟的即时任务直接提交到独立线程池执行，与调度器线程池分别计算并发上限
+    immediate_max_workers: int = field(default_factory=lambda: min(8, (os.cpu_count() or 1) * 2))
+
+    # 数据库连接池配置
+    db_pool_size: int = 20  # 连接池保持的连接数
+    db_max_overflow: int = 10  # 连接池满时允许额外创建的连接数
+    db_pool_recycle: int = 600  # 连接最长复用时间（秒）
 
     @property
     def database_dir(self) -> str:
@@ -4,11 +4,14 @@
 
 import os
 import zlib
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
-from sqlalchemy import Column, String, create_engine, DateTime, Text, INTEGER, LargeBinary, TypeDecorator
-from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from sqlalchemy import Column, DDL, String, create_engine, event, DateTime, Float, Text, INTEGER, \
+    LargeBinary, TypeDecorator, Index
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 
 from flowy.core.config import get_config
 
@@ -48,7 +51,8 @@ class Trigger(Base):
     max_instances = Column(INTEGER, default=1)
     enabled = Column(INTEGER, default=1)
     created_at = Column(DateTime)
-    updated_at = Column(DateTime)
+    # 调度同步以 MAX(updated_at) 判断触发器是否变化，任何 ORM 修改都会刷新该字段
+    updated_at = Column(DateTime, onupdate=datetime.now)
 
 
 class Flow(Base):
@@ -71,6 +75,19 @@ class FlowHistory(HistoryBase):
     input_data = Column(CompressedText)
     output_data = Column(CompressedText)
     status = Column(String(64))
+    remark_level = Column(String(16))  # 备注最高级别 (info/warning/error)，NULL 表示无备注
+    duration_seconds = Column(Float)  # 执行时长（秒），end_time - start_time
+    wait_seconds = Column(Float)  # 等待时长（秒），start_time - created_at
+
+    __table_args__ = (
+        # 统计聚合按 flow_id + status 过滤，最近记录按 created_at 排序
+        Index('ix_fh_flow_status_created', flow_id, status, created_at.desc()),
+        # 最近一次执行查询及图表按 flow_id + created_at 范围扫描，附带 status 列使其成为覆盖索引
+        Index('ix_fh_latest', flow_id, created_at.desc(), status),
+        # 孤儿任务检查按 status 过滤后分别按 created_at / start_time 范围扫描
+        Index('ix_fh_status_created', status, created_at),
+        Index('ix_fh_status_start', status, start_time),
+    )
 
 
 class TaskHistory(HistoryBase):
@@ -88,11 +105,74 @@ class TaskHistory(HistoryBase):
     progress_message = Column(String(256))  # 进度描述信息
     progress_updated_at = Column(DateTime)  # 进度最后更新时间
 
+    __table_args__ = (
+        # 按执行历史查询任务列表及最后一个任务
+        Index('ix_th_fh_created', flow_history_id, created_at.desc()),
+        # 孤儿任务检查按 status + start_time 查找长时间运行的任务
+        Index('ix_th_status_start', status, start_time),
+    )
+
+
+class FlowDailyStats(HistoryBase):
+    """Flow每日执行统计汇总
+
+    仅保存当天之前、有执行记录且所有记录均已结束的日期，由每日维护任务写入；
+    对应日期的执行历史被删除时，由 flow_history 上的删除触发器同步删除汇总
+    """
+    __tablename__ = 'flow_daily_stats'
+    flow_id = Column(String(64), primary_key=True)
+    day = Column(String(10), primary_key=True)  # 日期，格式 YYYY-MM-DD
+    total = Column(INTEGER, default=0)
+    completed = Column(INTEGER, default=0)
+    failed = Column(INTEGER, default=0)
+    duration_counts = Column(String(64))  # 已完成记录各时长分组的数量，逗号分隔
+
+
+# 删除执行历史时清除同一Flow、同一天的汇总，下次维护任务会重新统计；
+# 由数据库触发器完成，各删除路径无需额外执行语句。create_all 每次都会执行，已有数据库同样会创建
+FLOW_DAILY_STATS_TRIGGER_DDL = (
+    'CREATE TRIGGER IF NOT EXISTS trg_fh_delete_daily_stats AFTER DELETE ON flow_history '
+    'BEGIN DELETE FROM flow_daily_stats WHERE flow_id = OLD.flow_id AND day = date(OLD.created_at); END'
+)
+event.listen(HistoryBase.metadata, 'after_create', DDL(FLOW_DAILY_STATS_TRIGGER_DDL))
+
 
 # 延迟初始化的数据库引擎和会话
 _engine = None
 _history_engine = None
 _DBSession = None
+_ScopedSession = None
+
+
+def _create_sqlite_engine(url: str):
+    """创建SQLite引擎
+
+    使用连接池复用连接（会话关闭时连接归还连接池而非断开），
+    并在建立连接时启用WAL模式，使读操作不被写事务阻塞
+    """
+    config = get_config()
+    engine = create_engine(
+        url,
+        echo=False,
+        poolclass=QueuePool,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=config.db_pool_recycle,
+        connect_args={
+            'check_same_thread': False,
+            'timeout': 20
+        }
+    )
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    return engine
 
 
 def _get_engine():
@@ -101,15 +181,7 @@ def _get_engine():
     if _engine is None:
         config = get_config()
         os.makedirs(config.database_dir, exist_ok=True)
-        _engine = create_engine(
-            config.database_url,
-            echo=False,
-            pool_pre_ping=True,
-            connect_args={
-                'check_same_thread': False,
-                'timeout': 20
-            }
-        )
+        _engine = _create_sqlite_engine(config.database_url)
     return _engine
 
 
@@ -119,15 +191,7 @@ def _get_history_engine():
     if _history_engine is None:
         config = get_config()
         os.makedirs(config.database_dir, exist_ok=True)
-        _history_engine = create_engine(
-            config.history_database_url,
-            echo=False,
-            pool_pre_ping=True,
-            connect_args={
-                'check_same_thread': False,
-                'timeout': 20
-            }
-        )
+        _history_engine = _create_sqlite_engine(config.history_database_url)
     return _history_engine
 
 
@@ -141,7 +205,8 @@ def _get_session_maker():
             Flow: _get_engine(),
             Trigger: _get_engine(),
             FlowHistory: _get_history_engine(),
-            TaskHistory: _get_history_engine()
+            TaskHistory: _get_history_engine(),
+            FlowDailyStats: _get_history_engine()
         })
     return _DBSession
 
@@ -182,6 +247,67 @@ def get_session() -> Session:
     return _get_session_maker()()
 
 
+def _get_scoped_session() -> scoped_session:
+    """获取线程内共享的会话注册表（延迟初始化）"""
+    global _ScopedSession
+    if _ScopedSession is None:
+        _ScopedSession = scoped_session(_get_session_maker())
+    return _ScopedSession
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """会话上下文：正常退出时提交，异常时回滚，最终关闭并归还连接
+
+    会话按线程保存，同一线程内嵌套使用时直接复用外层会话，
+    由最外层负责提交、回滚和关闭，一次调度任务内只检出一次连接。
+
+    用法::
+
+        with session_scope() as session:
+            session.add(obj)
+    """
+    registry = _get_scoped_session()
+    if registry.registry.has():
+        yield registry()
+        return
+
+    session = registry()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        registry.remove()
+
+
+@contextmanager
+def count_queries() -> Iterator[list[str]]:
+    """记录代码块内在两个数据库上执行的SQL语句，用于排查N+1查询
+
+    用法::
+
+        with count_queries() as statements:
+            FlowService.get_all_flows_with_stats()
+        assert len(statements) <= 3
+    """
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = [_get_engine(), _get_history_engine()]
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', _record)
+
+
 def create_flow_history(
         session: Session,
         flow_id: str,
@@ -204,6 +330,7 @@ def create_flow_history(
         status=status,
         flow_id=flow_id,
     )
+    fill_flow_history_durations(flow_history)
     session.add(flow_history)
     return flow_history
 
@@ -224,9 +351,18 @@ def update_flow_history(
             flow_history.output_data = output_data
         if status is not None:
             flow_history.status = status
+        fill_flow_history_durations(flow_history)
     return flow_history
 
 
+def fill_flow_history_durations(flow_history: FlowHistory) -> None:
+    """根据时间字段计算并写入执行时长和等待时长，统计时直接聚合这两列"""
+    if flow_history.start_time and flow_history.end_time:
+        flow_history.duration_seconds = (flow_history.end_time - flow_history.start_time).total_seconds()
+    if flow_history.start_time and flow_history.created_at:
+        flow_history.wait_seconds = (flow_history.start_time - flow_history.created_at).total_seconds()
+
+
 def register_flow(
         session: Session,
         flow_id: str,
@@ -393,6 +529,10 @@ def get_current_db_version() -> str | None:
 # 备注相关功能
 # ============================================
 
+# 备注级别优先级：error > warning > info
+REMARK_LEVEL_PRIORITY = {'info': 1, 'warning': 2, 'error': 3}
+
+
 def add_flow_remark(
         session: Session,
         history_id: int,
@@ -412,7 +552,7 @@ def add_flow_remark(
     """
     from flowy.core.json_utils import json
 
-    if level not in ('info', 'warning', 'error'):
+    if level not in REMARK_LEVEL_PRIORITY:
         raise ValueError(f"无效的备注级别: {level}，必须是 info、warning 或 error")
 
     flow_history = session.query(FlowHistory).filter(
@@ -443,6 +583,10 @@ def add_flow_remark(
     metadata['remarks'] = remarks
     flow_history.flow_metadata = json.dumps(metadata)
 
+    # 同步更新备注最高级别，读取时无需再遍历备注列表
+    if REMARK_LEVEL_PRIORITY[level] > REMARK_LEVEL_PRIORITY.get(flow_history.remark_level, 0):
+        flow_history.remark_level = level
+
     # 提交更改到数据库
     session.commit()
 
@@ -8,8 +8,10 @@ from functools import wraps
 
 from flowy.core.json_utils import json
 
+from flowy.core.cache import invalidate_flow_caches, running_gauge
 from flowy.core.context import flow_history_id_var
-from flowy.core.db import init_database, get_session, create_flow_history, update_flow_history, register_flow, FlowHistory
+from flowy.core.db import init_database, get_session, create_flow_history, update_flow_history, register_flow, FlowHistory, \
+    fill_flow_history_durations
 from flowy.core.logger import get_flow_logger, cleanup_flow_logger
 
 # 初始化数据库
@@ -78,6 +80,7 @@ def flow(flow_id, name=None, desc=None):
         register_flow(session=session, flow_id=flow_id, name=name or flow_id, desc=desc)
         session.commit()
         session.close()
+        invalidate_flow_caches(flow_id)
         @wraps(func)
         def wrapper(*args, **kwargs):
             # 提取并移除 _metadata，不传递给原始函数
@@ -120,7 +123,10 @@ def flow(flow_id, name=None, desc=None):
                     history.start_time = start_time
                     history.input_data = input_json
                     history.flow_metadata = metadata_json
+                    fill_flow_history_durations(history)
                     session.commit()
+                    running_gauge.incr()
+                    invalidate_flow_caches(flow_id, refresh_stats=False)
                 else:
                     # 如果没有历史记录ID，创建新的
                     history = create_flow_history(
@@ -133,6 +139,8 @@ def flow(flow_id, name=None, desc=None):
                     )
                     session.commit()
                     flow_history_id = history.id
+                    running_gauge.incr()
+                    invalidate_flow_caches(flow_id, refresh_stats=False)
 
 
             except Exception as e:
@@ -198,6 +206,8 @@ def flow(flow_id, name=None, desc=None):
                                 status=status
                             )
                             session.commit()
+                            running_gauge.decr()
+                            invalidate_flow_caches(flow_id, refresh_stats=False)
                         except Exception as db_error:
                             session.rollback()
                             logger.error(f"更新flow历史失败: {db_error}")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""迁移: 修复双重编码的 flow_history.output_data
+
+版本: 20261016000001
+"""
+
+import sqlite3
+import zlib
+from pathlib import Path
+
+import orjson
+
+from flowy.core.config import get_config
+from flowy.core.migration_manager import Migration
+
+
+class Migration002NormalizeOutputData(Migration):
+    """修复双重编码的输出数据"""
+
+    version = '20261016000001'
+    name = 'normalize_output_data'
+    description = '将 flow_history 中被二次 JSON 编码的 output_data 还原为单次编码'
+
+    def upgrade(self, session):
+        """执行迁移"""
+        config = get_config()
+        db_path = Path(config.history_database_file)
+
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+        try:
+            # output_data 为压缩存储，无法在 SQL 中判断，逐行解压检查
+            cursor.execute('SELECT id, output_data FROM flow_history WHERE output_data IS NOT NULL')
+            updates = []
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                for history_id, compressed in rows:
+                    try:
+                        text = zlib.decompress(compressed).decode('utf-8')
+                        if text[:1] != '"':
+                            continue
+                        inner = orjson.loads(text)
+                        orjson.loads(inner)
+                    except (zlib.error, UnicodeDecodeError, orjson.JSONDecodeError, TypeError):
+                        continue
+                    updates.append((zlib.compress(inner.encode('utf-8'), level=9), history_id))
+
+            cursor.executemany('UPDATE flow_history SET output_data = ? WHERE id = ?', updates)
+            conn.commit()
+            print(f'  - 修复 {len(updates)} 条双重编码的 output_data')
+        finally:
+            conn.close()
+
+    def downgrade(self, session):
+        """回滚迁移"""
+        # 单次编码的数据可被新旧读取逻辑正确解析，无需回滚
+        print('提示: 该迁移无需回滚')
+
+
+# 导出迁移类，供迁移管理器使用
+Migration = Migration002NormalizeOutputData
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""迁移: 添加执行历史备注级别字段
+
+版本: 20261016000003
+"""
+
+import sqlite3
+from pathlib import Path
+
+import orjson
+
+from flowy.core.config import get_config
+from flowy.core.migration_manager import Migration
+
+# 备注级别优先级：error > warning > info
+REMARK_LEVEL_PRIORITY = {'info': 1, 'warning': 2, 'error': 3}
+
+
+class Migration004AddRemarkLevel(Migration):
+    """添加执行历史备注级别字段"""
+
+    version = '20261016000003'
+    name = 'add_remark_level'
+    description = '添加 flow_history 表的 remark_level 字段，并根据已有备注回填'
+
+    def upgrade(self, session):
+        """执行迁移"""
+        config = get_config()
+        db_path = Path(config.history_database_file)
+
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+        try:
+            # 获取现有列
+            cursor.execute("PRAGMA table_info(flow_history)")
+            existing_columns = {row[1] for row in cursor.fetchall()}
+
+            if 'remark_level' not in existing_columns:
+                cursor.execute('ALTER TABLE flow_history ADD COLUMN remark_level VARCHAR(16)')
+                print('  - 添加 remark_level 字段')
+
+            # 根据 flow_metadata 中的备注回填最高级别
+            cursor.execute(
+                "SELECT id, flow_metadata FROM flow_history WHERE flow_metadata LIKE '%\"remarks\"%'"
+            )
+            updates = []
+            for history_id, flow_metadata in cursor.fetchall():
+                try:
+                    remarks = orjson.loads(flow_metadata).get('remarks') or []
+                except (orjson.JSONDecodeError, AttributeError):
+                    continue
+                priority = max(
+                    (REMARK_LEVEL_PRIORITY.get(r.get('level'), 0) for r in remarks if isinstance(r, dict)),
+                    default=0
+                )
+                if priority:
+                    level = next(k for k, v in REMARK_LEVEL_PRIORITY.items() if v == priority)
+                    updates.append((level, history_id))
+
+            cursor.executemany('UPDATE flow_history SET remark_level = ? WHERE id = ?', updates)
+            conn.commit()
+            print(f'  - 回填 {len(updates)} 条记录的 remark_level')
+        finally:
+            conn.close()
+
+    def downgrade(self, session):
+        """回滚迁移"""
+        # SQLite 不支持直接删除列，需要重建表
+        print('警告: SQLite 不支持直接删除列，回滚操作需要手动执行')
+
+
+# 导出迁移类，供迁移管理器使用
+Migration = Migration004AddRemarkLevel
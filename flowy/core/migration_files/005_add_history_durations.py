@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""迁移: 添加执行历史时长字段
+
+版本: 20261016000004
+"""
+
+import sqlite3
+from pathlib import Path
+
+from flowy.core.config import get_config
+from flowy.core.migration_manager import Migration
+
+
+class Migration005AddHistoryDurations(Migration):
+    """添加执行历史时长字段"""
+
+    version = '20261016000004'
+    name = 'add_history_durations'
+    description = '添加 flow_history 表的 duration_seconds、wait_seconds 字段，并根据已有时间字段回填'
+
+    def upgrade(self, session):
+        """执行迁移"""
+        config = get_config()
+        db_path = Path(config.history_database_file)
+
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+        try:
+            # 获取现有列
+            cursor.execute("PRAGMA table_info(flow_history)")
+            existing_columns = {row[1] for row in cursor.fetchall()}
+
+            if 'duration_seconds' not in existing_columns:
+                cursor.execute('ALTER TABLE flow_history ADD COLUMN duration_seconds FLOAT')
+                print('  - 添加 duration_seconds 字段')
+
+            if 'wait_seconds' not in existing_columns:
+                cursor.execute('ALTER TABLE flow_history ADD COLUMN wait_seconds FLOAT')
+                print('  - 添加 wait_seconds 字段')
+
+            # 回填已有记录，精确到毫秒以消除 julianday 的浮点误差
+            cursor.execute('''
+                UPDATE flow_history
+                SET duration_seconds = ROUND((julianday(end_time) - julianday(start_time)) * 86400, 3)
+                WHERE start_time IS NOT NULL AND end_time IS NOT NULL AND duration_seconds IS NULL
+            ''')
+            print(f'  - 回填 {cursor.rowcount} 条记录的 duration_seconds')
+
+            cursor.execute('''
+                UPDATE flow_history
+                SET wait_seconds = ROUND((julianday(start_time) - julianday(created_at)) * 86400, 3)
+                WHERE start_time IS NOT NULL AND created_at IS NOT NULL AND wait_seconds IS NULL
+            ''')
+            print(f'  - 回填 {cursor.rowcount} 条记录的 wait_seconds')
+
+            conn.commit()
+        finally:
+            conn.close()
+
+    def downgrade(self, session):
+        """回滚迁移"""
+        # SQLite 不支持直接删除列，需要重建表
+        print('警告: SQLite 不支持直接删除列，回滚操作需要手动执行')
+
+
+# 导出迁移类，供迁移管理器使用
+Migration = Migration005AddHistoryDurations
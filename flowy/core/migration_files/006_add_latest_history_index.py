@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""迁移: 以覆盖索引替换执行历史时间索引
+
+版本: 20261016000005
+"""
+
+import sqlite3
+from pathlib import Path
+
+from flowy.core.config import get_config
+from flowy.core.migration_manager import Migration
+
+
+class Migration006AddLatestHistoryIndex(Migration):
+    """以覆盖索引替换执行历史时间索引"""
+
+    version = '20261016000005'
+    name = 'add_latest_history_index'
+    description = '将 flow_history 的 (flow_id, created_at) 索引替换为包含 status 的覆盖索引 ix_fh_latest'
+
+    def upgrade(self, session):
+        """执行迁移"""
+        config = get_config()
+        db_path = Path(config.history_database_file)
+
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS ix_fh_latest ON flow_history (flow_id, created_at DESC, status)'
+            )
+            print('  - 添加索引 ix_fh_latest')
+
+            # 新索引以相同列开头，旧索引不再需要
+            cursor.execute('DROP INDEX IF EXISTS ix_fh_flow_created')
+            print('  - 删除索引 ix_fh_flow_created')
+
+            cursor.execute('ANALYZE flow_history')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def downgrade(self, session):
+        """回滚迁移"""
+        config = get_config()
+        db_path = Path(config.history_database_file)
+
+        conn = sqlite3.connect(str(db_path))
+        try:
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_fh_flow_created ON flow_history (flow_id, created_at DESC)')
+            conn.execute('DROP INDEX IF EXISTS ix_fh_latest')
+            conn.commit()
+        finally:
+            conn.close()
+
+
+# 导出迁移类，供迁移管理器使用
+Migration = Migration006AddLatestHistoryIndex
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""迁移: 添加孤儿任务检查索引
+
+版本: 20261016000006
+"""
+
+import sqlite3
+from pathlib import Path
+
+from flowy.core.config import get_config
+from flowy.core.migration_manager import Migration
+
+
+class Migration007AddOrphanScanIndexes(Migration):
+    """添加孤儿任务检查索引"""
+
+    version = '20261016000006'
+    name = 'add_orphan_scan_indexes'
+    description = '为 flow_history 和 task_history 添加孤儿任务检查所需的 (status, 时间) 复合索引'
+
+    # (索引名, 表名, 索引列)
+    INDEXES = [
+        ('ix_fh_status_created', 'flow_history', 'status, created_at'),
+        ('ix_fh_status_start', 'flow_history', 'status, start_time'),
+        ('ix_th_status_start', 'task_history', 'status, start_time'),
+    ]
+
+    def upgrade(self, session):
+        """执行迁移"""
+        config = get_config()
+        db_path = Path(config.history_database_file)
+
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+        try:
+            for index_name, table_name, columns in self.INDEXES:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})')
+                print(f'  - 添加索引 {index_name}')
+
+            # 更新统计信息，便于查询规划器选择新索引
+            cursor.execute('ANALYZE flow_history')
+            cursor.execute('ANALYZE task_history')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def downgrade(self, session):
+        """回滚迁移"""
+        config = get_config()
+        db_path = Path(config.history_database_file)
+
+        conn = sqlite3.connect(str(db_path))
+        try:
+            for index_name, _, _ in self.INDEXES:
+                conn.execute(f'DROP INDEX IF EXISTS {index_name}')
+            conn.commit()
+        finally:
+            conn.close()
+
+
+# 导出迁移类，供迁移管理器使用
+Migration = Migration007AddOrphanScanIndexes
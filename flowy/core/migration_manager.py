@@ -4,7 +4,6 @@
 
 import hashlib
 import os
-import shutil
 import sqlite3
 from datetime import datetime
 from pathlib import Path
@@ -133,7 +132,8 @@ class MigrationManager:
         backup_path = backup_dir / f'{self.db_path.stem}_backup_{timestamp}.db'
 
         try:
-            shutil.copy2(self.db_path, backup_path)
+            # 使用 SQLite 在线备份接口，WAL 模式下尚未写回主文件的数据也会包含在备份中
+            self._copy_database(self.db_path, backup_path)
             return backup_path
         except Exception as e:
             print(f'备份数据库失败: {e}')
@@ -146,12 +146,23 @@ class MigrationManager:
             return False
 
         try:
-            shutil.copy2(backup_path, self.db_path)
+            self._copy_database(backup_path, self.db_path)
             return True
         except Exception as e:
             print(f'恢复数据库失败: {e}')
             return False
 
+    @staticmethod
+    def _copy_database(source: Path, target: Path) -> None:
+        """通过 SQLite 备份接口复制数据库"""
+        src = sqlite3.connect(str(source))
+        dst = sqlite3.connect(str(target))
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+
     def record_migration(self, session, migration: Migration):
         """记录已执行的迁移"""
         conn = sqlite3.connect(str(self.db_path))
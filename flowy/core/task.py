@@ -52,12 +52,14 @@ def task(name=None, desc=None):
                             "type": str(type(input_data))
                         })
 
+                    # 创建即开始执行，两个时间取同一时刻
+                    now = datetime.now()
                     task_history = create_task_history(
                         session=session,
                         flow_history_id=flow_history_id,
                         name=task_name,
-                        created_at=datetime.now(),
-                        start_time=datetime.now(),
+                        created_at=now,
+                        start_time=now,
                         input_data=input_json,
                         status='running'
                     )
@@ -2,9 +2,11 @@
 # -*- coding: utf-8 -*-
 """REST API控制器"""
 
-from flask import Blueprint, jsonify, request
+import orjson
+from flask import Blueprint, Response, jsonify, request
 from flowy.web.services.flow_service import FlowService
 from flowy.web.services.scheduler_service import SchedulerService
+from flowy.web.utils import make_etag, is_not_modified, with_etag
 
 api_bp = Blueprint('api', __name__)
 
@@ -88,6 +90,14 @@ def api_get_flow_history(flow_id):
         if not flow:
             return jsonify({'success': False, 'error': 'Flow not found'}), 404
 
+        # 存在运行中的记录时任务进度随时变化，不使用协商缓存
+        version, has_running = FlowService.get_history_version(flow_id)
+        etag = None
+        if not has_running:
+            etag = make_etag('history', flow_id, page, per_page, status_filter, version)
+            if is_not_modified(etag):
+                return '', 304
+
         histories, total_pages = FlowService.get_flow_history_paginated(
             flow_id=flow_id,
             page=page,
@@ -95,33 +105,37 @@ def api_get_flow_history(flow_id):
             status_filter=status_filter if status_filter else None
         )
 
-        histories_data = [{
-            'id': h.id,
-            'flow_id': h.flow_id,
-            'status': h.status,
-            'created_at': h.created_at.isoformat() if h.created_at else None,
-            'start_time': h.start_time.isoformat() if h.start_time else None,
-            'end_time': h.end_time.isoformat() if h.end_time else None,
-            'input_data': h.input_data,
-            'output_data': h.output_data,
-            'flow_metadata': h.flow_metadata,
-            'running_tasks': getattr(h, 'running_tasks', []),
-            'remarks': getattr(h, 'remarks', []),
-            'remark_level': getattr(h, 'remark_level', None)
-        } for h in histories]
+        pagination = {
+            'current_page': page,
+            'total_pages': total_pages,
+            'per_page': per_page,
+            'status_filter': status_filter
+        }
 
-        return jsonify({
+        # 一页数据量有限，直接用 orjson 编码为完整响应体，编码失败时仍可返回500
+        body = orjson.dumps({
             'success': True,
             'data': {
-                'histories': histories_data,
-                'pagination': {
-                    'current_page': page,
-                    'total_pages': total_pages,
-                    'per_page': per_page,
-                    'status_filter': status_filter
-                }
+                'histories': [{
+                    'id': h.id,
+                    'flow_id': h.flow_id,
+                    'status': h.status,
+                    'created_at': h.created_at.isoformat() if h.created_at else None,
+                    'start_time': h.start_time.isoformat() if h.start_time else None,
+                    'end_time': h.end_time.isoformat() if h.end_time else None,
+                    'input_data': h.input_data,
+                    'output_data': h.output_data,
+                    'flow_metadata': h.flow_metadata,
+                    'running_tasks': getattr(h, 'running_tasks', []),
+                    'remarks': getattr(h, 'remarks', []),
+                    'remark_level': getattr(h, 'remark_level', None)
+                } for h in histories],
+                'pagination': pagination
             }
         })
+
+        response = Response(body, mimetype='application/json')
+        return with_etag(response, etag) if etag else response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -4,7 +4,7 @@
 
 from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify, make_response
 from flowy.web.services.flow_service import FlowService
-from flowy.core.db import get_session, FlowHistory
+from flowy.web.utils import make_etag, is_not_modified, with_etag
 from datetime import datetime
 
 flows_bp = Blueprint('flows', __name__)
@@ -209,10 +209,7 @@ def api_get_history_logs(history_id):
 def api_running_count():
     """获取正在运行的任务数量"""
     try:
-        session = get_session()
-        running_count = session.query(FlowHistory).filter(FlowHistory.status == 'running').count()
-        session.close()
-        return jsonify({'count': running_count})
+        return jsonify({'count': FlowService.get_running_count()})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -225,11 +222,18 @@ def api_flow_chart_data(flow_id):
     """获取Flow图表数据"""
     try:
         days = request.args.get('days', 30, type=int)
-        chart_data = FlowService.get_flow_chart_data(flow_id, days)
-        return jsonify({
+        version, _ = FlowService.get_history_version(flow_id)
+        # 图表按日期和整点划分统计窗口，没有新的执行记录时跨小时同样需要重新生成
+        window = FlowService.get_chart_window()
+        etag = make_etag('chart', flow_id, days, window.isoformat(), version)
+        if is_not_modified(etag):
+            return '', 304
+
+        chart_data = FlowService.get_flow_chart_data(flow_id, days, window)
+        return with_etag(jsonify({
             'success': True,
             'data': chart_data
-        })
+        }), etag)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -265,8 +269,8 @@ def api_history_tasks(history_id):
                 'start_time': task.start_time.isoformat() if task.start_time else None,
                 'end_time': task.end_time.isoformat() if task.end_time else None,
                 'duration': duration,
-                'has_input': bool(task.input_data),
-                'has_output': bool(task.output_data)
+                'has_input': task.has_input,
+                'has_output': task.has_output
             })
 
         return jsonify({
@@ -6,7 +6,9 @@ import logging
 from flask import Blueprint, jsonify, request
 from flowy.core.json_utils import json
 
+from flowy.core.db import session_scope
 from flowy.web.services.trigger_service import TriggerService
+from flowy.web.utils import make_etag, is_not_modified, with_etag
 
 logger = logging.getLogger(__name__)
 
@@ -55,11 +57,17 @@ def api_list_triggers(flow_id):
         JSON响应，包含触发器列表
     """
     try:
-        triggers = TriggerService.get_triggers_by_flow(flow_id)
-        return jsonify({
+        # 版本查询与列表查询共用同一个会话
+        with session_scope():
+            etag = make_etag('triggers', flow_id, TriggerService.get_triggers_version(flow_id))
+            if is_not_modified(etag):
+                return '', 304
+
+            triggers = TriggerService.get_triggers_by_flow(flow_id)
+        return with_etag(jsonify({
             'success': True,
             'data': [trigger_to_dict(t) for t in triggers]
-        })
+        }), etag)
     except Exception as e:
         logger.error(f"获取触发器列表失败: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
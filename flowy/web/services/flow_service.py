@@ -2,13 +2,145 @@
 # -*- coding: utf-8 -*-
 """Flow业务逻辑服务层"""
 
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, List, Dict, Optional, Tuple
+from datetime import date, datetime, timedelta
 
 from flowy.core.json_utils import json
-from sqlalchemy import func, desc, asc, and_
-
-from flowy.core.db import Flow, FlowHistory, TaskHistory, get_session, get_running_tasks, get_flow_remarks
+from sqlalchemy import func, desc, asc, and_, or_, case, select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased
+
+from flowy.core.cache import chart_cache, flow_stats_cache, invalidate_flow_caches, running_gauge
+from flowy.core.db import Flow, FlowHistory, TaskHistory, FlowDailyStats, get_session, get_flow_remarks
+
+# 执行时长分布的分组边界（分钟）及对应标签
+DURATION_BUCKET_EDGES = (1, 5, 15, 60)
+DURATION_BUCKET_LABELS = ('< 1分钟', '1-5分钟', '5-15分钟', '15-60分钟', '> 60分钟')
+
+# JSON文本可能的首字符
+_JSON_START_CHARS = frozenset('{["-0123456789tfn')
+
+# 批量删除时每条语句包含的ID数量
+_DELETE_BATCH_SIZE = 500
+
+
+@dataclass(slots=True)
+class FlowHistoryView:
+    """执行历史列表项，不绑定数据库会话"""
+    id: int
+    flow_id: str
+    status: str
+    created_at: Optional[datetime]
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    input_data: Any
+    output_data: Any
+    flow_metadata: Optional[str]
+    trigger_name: Optional[str] = None
+    trigger_type: Optional[str] = None
+    remarks: list = field(default_factory=list)
+    remark_level: Optional[str] = None
+    running_tasks: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class TaskHistoryView:
+    """任务历史项，不绑定数据库会话"""
+    id: int
+    flow_history_id: int
+    name: str
+    status: str
+    created_at: Optional[datetime]
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    progress: Optional[int]
+    progress_message: Optional[str]
+    progress_updated_at: Optional[datetime]
+    input_data: Any = None
+    output_data: Any = None
+    has_input: bool = False
+    has_output: bool = False
+
+
+# 执行历史视图所需的列
+_FLOW_HISTORY_COLUMNS = (
+    FlowHistory.id,
+    FlowHistory.flow_id,
+    FlowHistory.status,
+    FlowHistory.created_at,
+    FlowHistory.start_time,
+    FlowHistory.end_time,
+    FlowHistory.input_data,
+    FlowHistory.output_data,
+    FlowHistory.flow_metadata,
+    FlowHistory.remark_level
+)
+
+# 任务历史视图所需的列（不含输入输出数据）
+_TASK_HISTORY_COLUMNS = (
+    TaskHistory.id,
+    TaskHistory.flow_history_id,
+    TaskHistory.name,
+    TaskHistory.status,
+    TaskHistory.created_at,
+    TaskHistory.start_time,
+    TaskHistory.end_time,
+    TaskHistory.progress,
+    TaskHistory.progress_message,
+    TaskHistory.progress_updated_at
+)
+
+
+def _parse_json_column(value: Optional[str]) -> Any:
+    """解析JSON列，空值直接返回空字典而不调用解析器"""
+    if not value or value == '{}':
+        return {}
+    return json.safe_loads(value)
+
+
+def _maybe_json(value: Optional[str]) -> Any:
+    """尝试解析JSON，首字符不可能构成JSON时直接返回原文本，避免解析失败的异常开销
+
+    空值返回 None，解析失败时返回原文本
+    """
+    if not value:
+        return None
+    if value[0] not in _JSON_START_CHARS:
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _task_view_fields(row) -> Dict:
+    """从查询行中提取任务视图的基础字段"""
+    return {column.key: getattr(row, column.key) for column in _TASK_HISTORY_COLUMNS}
+
+
+def _duration_bucket():
+    """按执行时长计算分组序号的SQL表达式，对应 DURATION_BUCKET_LABELS 的下标"""
+    seconds = FlowHistory.duration_seconds
+    return case(
+        *[(seconds < edge * 60, index) for index, edge in enumerate(DURATION_BUCKET_EDGES)],
+        else_=len(DURATION_BUCKET_EDGES)
+    )
+
+
+def _paginate(query, page: int, per_page: int) -> Tuple[list, int]:
+    """执行分页查询，总数通过窗口函数随数据在同一条SELECT中返回
+
+    Returns:
+        (当前页的行, 总记录数)，每行末尾附带 _total 列
+    """
+    rows = query.add_columns(func.count().over().label('_total')) \
+        .offset((page - 1) * per_page).limit(per_page).all()
+    if rows:
+        return rows, rows[0]._total
+    # 页码越界时当前页无数据，回退为单独计数以返回正确的总页数
+    return rows, (query.order_by(None).count() if page > 1 else 0)
 
 
 class FlowService:
@@ -18,25 +150,42 @@ class FlowService:
     def get_all_flows_with_stats() -> List[Dict]:
         """获取所有Flow及其统计信息（用于侧边栏）
         
-        优化：使用单个会话完成所有查询，避免嵌套会话导致的连接泄露
+        优化：使用单个会话完成所有查询，所有Flow的统计通过 GROUP BY 一次查出，避免逐个Flow查询；
+        结果短时缓存，注册Flow或删除历史时失效；执行状态变化不清除缓存，计数最多延迟一个TTL周期
         """
+        flows_with_stats = flow_stats_cache.get('all')
+        if flows_with_stats is None:
+            flows_with_stats = FlowService._compute_all_flows_with_stats()
+            flow_stats_cache.set('all', flows_with_stats)
+        return flows_with_stats
+
+    @staticmethod
+    def _compute_all_flows_with_stats() -> List[Dict]:
+        """从数据库统计所有Flow及其统计信息"""
         session = get_session()
         try:
             flows = session.query(Flow).order_by(Flow.name).all()
 
+            # 所有Flow的统计及最近一次执行记录通过一条 GROUP BY 查询获得
+            stats_rows = session.query(
+                *FlowService._flow_stats_columns(),
+                *FlowService._latest_history_columns(FlowHistory.flow_id),
+                FlowHistory.flow_id
+            ).group_by(FlowHistory.flow_id).all()
+            stats_map = {row.flow_id: row for row in stats_rows}
+
+            empty_row = (0, 0, 0, 0, 0, None, None)
             flows_with_stats = []
             for flow in flows:
-                # 在同一个会话中获取统计信息，避免创建新会话
-                stats = FlowService._get_flow_statistics_with_session(session, flow.id)
-                
-                # 分离对象
-                session.expunge(flow)
-                
+                row = stats_map.get(flow.id)
+                stats = FlowService._build_flow_stats(row or empty_row, row)
                 flows_with_stats.append({
                     'flow': flow,
                     'stats': stats
                 })
 
+            # 一次性分离所有对象
+            session.expunge_all()
             return flows_with_stats
         finally:
             session.close()
@@ -44,77 +193,77 @@ class FlowService:
     @staticmethod
     def _get_flow_statistics_with_session(session, flow_id: str) -> Dict:
         """使用现有会话获取Flow的统计信息（内部方法，避免创建新会话）"""
-        total_count = session.query(func.count(FlowHistory.id)).filter(
+        # 各状态数量、平均时长及最近一次执行在一条查询中完成
+        row = session.query(
+            *FlowService._flow_stats_columns(),
+            *FlowService._latest_history_columns(flow_id)
+        ).filter(
             FlowHistory.flow_id == flow_id
-        ).scalar() or 0
-
-        success_count = session.query(func.count(FlowHistory.id)).filter(
-            FlowHistory.flow_id == flow_id,
-            FlowHistory.status == 'completed'
-        ).scalar() or 0
+        ).one()
 
-        failed_count = session.query(func.count(FlowHistory.id)).filter(
-            FlowHistory.flow_id == flow_id,
-            FlowHistory.status == 'failed'
-        ).scalar() or 0
+        latest_history = row if row.latest_execution is not None else None
+        return FlowService._build_flow_stats(row, latest_history)
 
-        running_count = session.query(func.count(FlowHistory.id)).filter(
-            FlowHistory.flow_id == flow_id,
-            FlowHistory.status == 'running'
-        ).scalar() or 0
+    @staticmethod
+    def _flow_stats_columns() -> Tuple:
+        """Flow统计所需的聚合列
 
-        pending_count = session.query(func.count(FlowHistory.id)).filter(
-            FlowHistory.flow_id == flow_id,
-            FlowHistory.status == 'pending'
-        ).scalar() or 0
+        依次为：总数、成功数、失败数、运行中数、等待中数、平均执行时长（秒）、平均等待时长（秒）
+        """
+        def count_status(status: str):
+            return func.sum(case((FlowHistory.status == status, 1), else_=0))
+
+        # 时长在写入时预先计算，缺少起止时间的记录为 NULL，不参与平均
+        return (
+            func.count(FlowHistory.id),
+            count_status('completed'),
+            count_status('failed'),
+            count_status('running'),
+            count_status('pending'),
+            func.avg(case((FlowHistory.status == 'completed', FlowHistory.duration_seconds))),
+            func.avg(case((FlowHistory.status.in_(['pending', 'running']), FlowHistory.wait_seconds))),
+        )
 
-        success_rate = (success_count / total_count * 100) if total_count > 0 else 0
+    @staticmethod
+    def _latest_history_columns(flow_id_expr) -> Tuple:
+        """最近一次执行记录的状态和时间列
 
-        # 计算平均执行时长 - 使用聚合查询而非加载所有记录
-        avg_duration_result = session.query(
-            func.avg(
-                func.julianday(FlowHistory.end_time) - func.julianday(FlowHistory.start_time)
-            ) * 86400  # 转换为秒
-        ).filter(
-            FlowHistory.flow_id == flow_id,
-            FlowHistory.status == 'completed',
-            FlowHistory.start_time.isnot(None),
-            FlowHistory.end_time.isnot(None)
-        ).scalar()
-        
-        avg_duration = round(avg_duration_result, 1) if avg_duration_result else 0
+        Args:
+            flow_id_expr: 工作流ID或外层查询的 flow_id 列（分组查询时作为相关子查询条件）
+        """
+        latest = aliased(FlowHistory)
+        latest_status = select(latest.status).where(
+            latest.flow_id == flow_id_expr
+        ).order_by(desc(latest.created_at)).limit(1).scalar_subquery()
+        return (
+            latest_status.label('latest_status'),
+            func.max(FlowHistory.created_at).label('latest_execution')
+        )
 
-        # 计算平均等待时长
-        avg_wait_result = session.query(
-            func.avg(
-                func.julianday(FlowHistory.start_time) - func.julianday(FlowHistory.created_at)
-            ) * 86400
-        ).filter(
-            FlowHistory.flow_id == flow_id,
-            FlowHistory.status.in_(['pending', 'running']),
-            FlowHistory.start_time.isnot(None)
-        ).scalar()
-        
-        avg_wait_time = round(avg_wait_result, 1) if avg_wait_result else 0
+    @staticmethod
+    def _build_flow_stats(row, latest_history) -> Dict:
+        """根据聚合结果和最近一次执行记录构建统计信息字典
 
-        latest_history = session.query(FlowHistory).filter(
-            FlowHistory.flow_id == flow_id
-        ).order_by(desc(FlowHistory.created_at)).first()
+        latest_history 需提供 latest_status、latest_execution 属性，无执行记录时为 None
+        """
+        total_count, success_count, failed_count, running_count, pending_count, \
+            avg_duration_result, avg_wait_result = row[:7]
 
-        latest_status = latest_history.status if latest_history else None
-        latest_execution = latest_history.created_at if latest_history else None
+        total_count = total_count or 0
+        success_count = success_count or 0
+        success_rate = (success_count / total_count * 100) if total_count > 0 else 0
 
         return {
             'total_count': total_count,
             'success_count': success_count,
-            'failed_count': failed_count,
-            'running_count': running_count,
-            'pending_count': pending_count,
+            'failed_count': failed_count or 0,
+            'running_count': running_count or 0,
+            'pending_count': pending_count or 0,
             'success_rate': round(success_rate, 2),
-            'avg_duration': avg_duration,
-            'avg_wait_time': avg_wait_time,
-            'latest_status': latest_status,
-            'latest_execution': latest_execution
+            'avg_duration': round(avg_duration_result, 1) if avg_duration_result else 0,
+            'avg_wait_time': round(avg_wait_result, 1) if avg_wait_result else 0,
+            'latest_status': latest_history.latest_status if latest_history else None,
+            'latest_execution': latest_history.latest_execution if latest_history else None
         }
 
     @staticmethod
@@ -127,15 +276,15 @@ class FlowService:
             if search:
                 search = f"%{search}%"
                 query = query.filter(
-                    func.or_(
+                    or_(
                         Flow.name.like(search),
                         Flow.description.like(search)
                     )
                 )
 
             query = query.order_by(desc(Flow.created_at))
-            total = query.count()
-            flows = query.offset((page - 1) * per_page).limit(per_page).all()
+            rows, total = _paginate(query, page, per_page)
+            flows = [row[0] for row in rows]
 
             return flows, (total + per_page - 1) // per_page
         finally:
@@ -162,95 +311,140 @@ class FlowService:
         finally:
             session.close()
 
+    @staticmethod
+    def get_history_version(flow_id: str) -> Tuple[str, bool]:
+        """获取Flow执行历史的版本标识（用于ETag）
+
+        新增、删除或状态流转（开始/结束）都会改变版本标识。
+
+        Returns:
+            (版本标识, 是否存在运行中的记录)
+        """
+        session = get_session()
+        try:
+            total, latest_created, latest_start, latest_end, running = session.query(
+                func.count(FlowHistory.id),
+                func.max(FlowHistory.created_at),
+                func.max(FlowHistory.start_time),
+                func.max(FlowHistory.end_time),
+                func.count(FlowHistory.id).filter(FlowHistory.status == 'running')
+            ).filter(FlowHistory.flow_id == flow_id).one()
+            return f'{total}:{latest_created}:{latest_start}:{latest_end}', bool(running)
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_running_count() -> int:
+        """获取正在运行的Flow数量
+
+        读取进程内计数器，仅在冷启动或每60秒同步时查询数据库
+        """
+        return running_gauge.get(FlowService._count_running_flows)
+
+    @staticmethod
+    def _count_running_flows() -> int:
+        """从数据库统计正在运行的Flow数量"""
+        session = get_session()
+        try:
+            return session.query(func.count(FlowHistory.id)).filter(
+                FlowHistory.status == 'running'
+            ).scalar() or 0
+        finally:
+            session.close()
+
     @staticmethod
     def get_flow_history_paginated(flow_id: str, page: int = 1, per_page: int = 30,
-                                   status_filter: str = None) -> Tuple[List[FlowHistory], int]:
+                                   status_filter: str = None) -> Tuple[List[FlowHistoryView], int]:
         """获取Flow执行历史分页列表"""
         session = get_session()
         try:
-            query = session.query(FlowHistory).filter(FlowHistory.flow_id == flow_id)
+            # 仅查询所需列，避免ORM实例化和身份映射开销
+            query = session.query(*_FLOW_HISTORY_COLUMNS).filter(FlowHistory.flow_id == flow_id)
 
             if status_filter:
                 query = query.filter(FlowHistory.status == status_filter)
 
             query = query.order_by(desc(FlowHistory.created_at))
-            total = query.count()
-            histories = query.offset((page - 1) * per_page).limit(per_page).all()
-
-            # 解析JSON数据并为运行中的历史记录获取正在运行的任务
-            for history in histories:
-                # 先从会话中分离对象，避免 autoflush 问题
-                session.expunge(history)
-
-                try:
-                    history.input_data = json.safe_loads(history.input_data or '{}')
-                except (ValueError, TypeError):
-                    history.input_data = {}
-
-                # 输出数据可能是双重编码的，需要尝试双重解析
-                try:
-                    parsed_output = json.safe_loads(history.output_data or '{}')
-                    # 如果解析后仍然是字符串，再解析一次
-                    if isinstance(parsed_output, str):
-                        history.output_data = json.safe_loads(parsed_output)
-                    else:
-                        history.output_data = parsed_output
-                except (ValueError, TypeError):
-                    history.output_data = {}
+            rows, total = _paginate(query, page, per_page)
+
+            # 解析JSON数据
+            histories = []
+            for row in rows:
+                history = FlowHistoryView(
+                    id=row.id,
+                    flow_id=row.flow_id,
+                    status=row.status,
+                    created_at=row.created_at,
+                    start_time=row.start_time,
+                    end_time=row.end_time,
+                    input_data=_parse_json_column(row.input_data),
+                    output_data=_parse_json_column(row.output_data),
+                    flow_metadata=row.flow_metadata,
+                    remark_level=row.remark_level
+                )
+                histories.append(history)
 
                 # 解析触发器信息和备注
-                history.trigger_name = None
-                history.trigger_type = None
-                history.remarks = []
                 try:
-                    metadata = json.safe_loads(history.flow_metadata or '{}')
+                    metadata = _parse_json_column(history.flow_metadata)
                     history.trigger_name = metadata.get('trigger_name')
                     history.trigger_type = metadata.get('trigger_type')
                     history.remarks = metadata.get('remarks', [])
                 except (ValueError, TypeError):
                     pass
 
-                # 计算备注的最高级别（用于前端显示图标颜色）
-                history.remark_level = None
-                if history.remarks:
-                    # 优先级：error > warning > info
-                    if any(r['level'] == 'error' for r in history.remarks):
-                        history.remark_level = 'error'
-                    elif any(r['level'] == 'warning' for r in history.remarks):
-                        history.remark_level = 'warning'
-                    else:
-                        history.remark_level = 'info'
-
-                # 对于运行中的历史记录，获取正在运行的任务及其进度
+            # 批量获取任务信息：运行中的记录取正在运行的任务，其余记录取最后一个任务
+            running_ids = [h.id for h in histories if h.status == 'running']
+            other_ids = [h.id for h in histories if h.status != 'running']
+
+            running_map = defaultdict(list)
+            if running_ids:
+                running_rows = session.query(
+                    TaskHistory.id,
+                    TaskHistory.flow_history_id,
+                    TaskHistory.name,
+                    TaskHistory.progress,
+                    TaskHistory.progress_message,
+                    TaskHistory.progress_updated_at
+                ).filter(
+                    TaskHistory.flow_history_id.in_(running_ids),
+                    TaskHistory.status == 'running'
+                ).order_by(TaskHistory.id).all()
+                for t in running_rows:
+                    running_map[t.flow_history_id].append({
+                        'id': t.id,
+                        'name': t.name,
+                        'progress': t.progress,
+                        'progress_message': t.progress_message,
+                        'progress_updated_at': t.progress_updated_at.isoformat() if t.progress_updated_at else None
+                    })
+
+            last_task_map = {}
+            if other_ids:
+                ranked = session.query(
+                    TaskHistory.id,
+                    TaskHistory.flow_history_id,
+                    TaskHistory.name,
+                    TaskHistory.status,
+                    func.row_number().over(
+                        partition_by=TaskHistory.flow_history_id,
+                        order_by=desc(TaskHistory.created_at)
+                    ).label('rn')
+                ).filter(TaskHistory.flow_history_id.in_(other_ids)).subquery()
+                for t in session.query(ranked).filter(ranked.c.rn == 1).all():
+                    last_task_map[t.flow_history_id] = {
+                        'id': t.id,
+                        'name': t.name,
+                        'status': t.status,
+                        'progress': None,
+                        'progress_message': None
+                    }
+
+            for history in histories:
                 if history.status == 'running':
-                    running_tasks = get_running_tasks(session, history.id)
-                    history.running_tasks = [
-                        {
-                            'id': t.id,
-                            'name': t.name,
-                            'progress': t.progress,
-                            'progress_message': t.progress_message,
-                            'progress_updated_at': t.progress_updated_at.isoformat() if t.progress_updated_at else None
-                        }
-                        for t in running_tasks
-                    ]
-                else:
-                    # 对于非运行状态，获取最后一个任务用于展示
-                    last_task = session.query(TaskHistory).filter(
-                        TaskHistory.flow_history_id == history.id
-                    ).order_by(desc(TaskHistory.created_at)).first()
-                    if last_task:
-                        history.running_tasks = [
-                            {
-                                'id': last_task.id,
-                                'name': last_task.name,
-                                'status': last_task.status,
-                                'progress': None,
-                                'progress_message': None
-                            }
-                        ]
-                    else:
-                        history.running_tasks = []
+                    history.running_tasks = running_map.get(history.id, [])
+                elif history.id in last_task_map:
+                    history.running_tasks = [last_task_map[history.id]]
 
             return histories, (total + per_page - 1) // per_page
         finally:
@@ -261,66 +455,52 @@ class FlowService:
         """获取执行历史详情"""
         session = get_session()
         try:
-            history = session.query(FlowHistory).filter(
-                FlowHistory.id == history_id
+            row = session.execute(
+                select(*_FLOW_HISTORY_COLUMNS).where(FlowHistory.id == history_id)
             ).first()
 
-            if not history:
+            if not row:
                 return None
 
-            # 获取Flow信息
+            history = FlowHistoryView(
+                id=row.id,
+                flow_id=row.flow_id,
+                status=row.status,
+                created_at=row.created_at,
+                start_time=row.start_time,
+                end_time=row.end_time,
+                input_data=_parse_json_column(row.input_data),
+                output_data=_parse_json_column(row.output_data),
+                flow_metadata=row.flow_metadata,
+                remark_level=row.remark_level
+            )
+
+            # 获取Flow信息（会话关闭后对象自动分离，已加载的属性仍可访问）
             flow = session.query(Flow).filter(
                 Flow.id == history.flow_id
             ).first()
 
-            task_histories = session.query(TaskHistory).filter(
-                TaskHistory.flow_history_id == history_id
-            ).order_by(asc(TaskHistory.created_at)).all()
-
-            session.expunge(history)
-            if flow:
-                session.expunge(flow)
-            for task in task_histories:
-                session.expunge(task)
-
-            try:
-                history.input_data = json.safe_loads(history.input_data or '{}')
-            except (ValueError, TypeError):
-                history.input_data = {}
-
-            try:
-                history.output_data = json.safe_loads(history.output_data or '{}')
-            except (ValueError, TypeError):
-                history.output_data = {}
+            task_rows = session.execute(
+                select(*_TASK_HISTORY_COLUMNS, TaskHistory.input_data, TaskHistory.output_data)
+                .where(TaskHistory.flow_history_id == history_id)
+                .order_by(asc(TaskHistory.created_at))
+            ).all()
+            task_histories = [
+                TaskHistoryView(
+                    **_task_view_fields(t),
+                    input_data=_parse_json_column(t.input_data),
+                    output_data=_parse_json_column(t.output_data)
+                )
+                for t in task_rows
+            ]
 
             # 解析备注信息
-            history.remarks = []
-            history.remark_level = None
             try:
-                metadata = json.safe_loads(history.flow_metadata or '{}')
+                metadata = _parse_json_column(history.flow_metadata)
                 history.remarks = metadata.get('remarks', [])
-                # 计算备注的最高级别
-                if history.remarks:
-                    if any(r['level'] == 'error' for r in history.remarks):
-                        history.remark_level = 'error'
-                    elif any(r['level'] == 'warning' for r in history.remarks):
-                        history.remark_level = 'warning'
-                    else:
-                        history.remark_level = 'info'
             except (ValueError, TypeError):
                 pass
 
-            for task in task_histories:
-                try:
-                    task.input_data = json.safe_loads(task.input_data or '{}')
-                except (ValueError, TypeError):
-                    task.input_data = {}
-
-                try:
-                    task.output_data = json.safe_loads(task.output_data or '{}')
-                except (ValueError, TypeError):
-                    task.output_data = {}
-
             return {
                 'flow_history': history,
                 'task_histories': task_histories,
@@ -348,9 +528,12 @@ class FlowService:
                 TaskHistory.flow_history_id == history_id
             ).delete()
 
+            flow_id = history.flow_id
+
             # 删除执行历史
             session.delete(history)
             session.commit()
+            invalidate_flow_caches(flow_id)
             return True
         except Exception:
             session.rollback()
@@ -365,29 +548,24 @@ class FlowService:
         """
         session = get_session()
         success_count = 0
-        failed_count = 0
         try:
-            for history_id in history_ids:
-                try:
-                    history = session.query(FlowHistory).filter(
-                        FlowHistory.id == history_id
-                    ).first()
-
-                    if history:
-                        # 删除关联的任务历史
-                        session.query(TaskHistory).filter(
-                            TaskHistory.flow_history_id == history_id
-                        ).delete()
-                        # 删除执行历史
-                        session.delete(history)
-                        success_count += 1
-                    else:
-                        failed_count += 1
-                except Exception:
-                    failed_count += 1
+            # 分批执行，避免超出 SQLite 单条语句的参数数量限制
+            for start in range(0, len(history_ids), _DELETE_BATCH_SIZE):
+                batch = history_ids[start:start + _DELETE_BATCH_SIZE]
+                # 删除关联的任务历史
+                session.execute(
+                    delete(TaskHistory).where(TaskHistory.flow_history_id.in_(batch))
+                )
+                # 删除执行历史
+                result = session.execute(
+                    delete(FlowHistory).where(FlowHistory.id.in_(batch))
+                )
+                success_count += result.rowcount
 
             session.commit()
-            return success_count, failed_count
+            if success_count:
+                invalidate_flow_caches()
+            return success_count, len(history_ids) - success_count
         except Exception:
             session.rollback()
             raise
@@ -395,27 +573,34 @@ class FlowService:
             session.close()
 
     @staticmethod
-    def get_task_histories(history_id: int) -> List[TaskHistory]:
-        """获取执行历史的任务列表"""
+    def get_task_histories(history_id: int) -> List[TaskHistoryView]:
+        """获取执行历史的任务列表
+
+        不加载输入输出数据，仅通过 has_input/has_output 标记是否存在
+        """
         session = get_session()
         try:
-            task_histories = session.query(TaskHistory).filter(
-                TaskHistory.flow_history_id == history_id
-            ).order_by(asc(TaskHistory.created_at)).all()
-
-            # 分离对象以避免会话问题
-            for task in task_histories:
-                session.expunge(task)
+            # 与空字符串比较时参数同样经过压缩，可直接在SQL中判断是否为空
+            rows = session.execute(
+                select(
+                    *_TASK_HISTORY_COLUMNS,
+                    and_(TaskHistory.input_data.isnot(None), TaskHistory.input_data != '').label('has_input'),
+                    and_(TaskHistory.output_data.isnot(None), TaskHistory.output_data != '').label('has_output')
+                )
+                .where(TaskHistory.flow_history_id == history_id)
+                .order_by(asc(TaskHistory.created_at))
+            ).all()
 
-            return task_histories
+            return [
+                TaskHistoryView(**_task_view_fields(t), has_input=bool(t.has_input), has_output=bool(t.has_output))
+                for t in rows
+            ]
         finally:
             session.close()
 
     @staticmethod
     def get_task_data(task_id: int) -> Optional[Dict]:
         """获取任务的输入输出数据"""
-        from flowy.core.json_utils import json
-
         session = get_session()
         try:
             task = session.query(TaskHistory).filter(
@@ -425,23 +610,9 @@ class FlowService:
             if not task:
                 return None
 
-            session.expunge(task)
-
-            # 解析 JSON 数据
-            input_data = None
-            output_data = None
-
-            if task.input_data:
-                try:
-                    input_data = json.safe_loads(task.input_data)
-                except (ValueError, TypeError):
-                    input_data = task.input_data
-
-            if task.output_data:
-                try:
-                    output_data = json.safe_loads(task.output_data)
-                except (ValueError, TypeError):
-                    output_data = task.output_data
+            # 解析 JSON 数据，非 JSON 内容原样返回
+            input_data = _maybe_json(task.input_data)
+            output_data = _maybe_json(task.output_data)
 
             return {
                 'id': task.id,
@@ -457,111 +628,201 @@ class FlowService:
             session.close()
 
     @staticmethod
-    def get_flow_chart_data(flow_id: str, days: int = 30) -> Dict:
-        """获取Flow图表数据"""
-        from datetime import timedelta
+    def get_chart_window() -> datetime:
+        """图表统计窗口的基准时间，取当前整点
+
+        按日统计从基准日期往前推，每小时分布统计基准时间之前7天，
+        同一小时内窗口不变，跨小时或跨天后图表结果随之变化
+        """
+        return datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def get_flow_chart_data(flow_id: str, days: int = 30, window: Optional[datetime] = None) -> Dict:
+        """获取Flow图表数据
+
+        结果按 (flow_id, days, 窗口基准时间) 短时缓存，执行结束或删除历史时失效
+        """
+        if window is None:
+            window = FlowService.get_chart_window()
+        cache_key = (flow_id, days, window)
+        chart_data = chart_cache.get(cache_key)
+        if chart_data is None:
+            chart_data = FlowService._compute_flow_chart_data(flow_id, days, window)
+            chart_cache.set(cache_key, chart_data)
+        return chart_data
+
+    @staticmethod
+    def rollup_daily_stats(days: int) -> int:
+        """将最近 days 天（不含今天）的执行历史按 Flow、日期汇总写入每日统计表
+
+        只汇总有执行记录且所有记录均已结束的日期，已汇总的日期保持不变。
+        由调度器的维护任务每天执行，图表查询只读取汇总结果
+
+        Returns:
+            新写入的汇总条数
+        """
+        today = date.today()
+        start = datetime.combine(today - timedelta(days=days), datetime.min.time())
+        end = datetime.combine(today, datetime.min.time())
+
+        day = func.date(FlowHistory.created_at)
+        is_completed = FlowHistory.status == 'completed'
+        has_duration = and_(is_completed, FlowHistory.duration_seconds.isnot(None))
+        bucket = _duration_bucket()
+
         session = get_session()
         try:
-            # 获取指定天数内的执行记录
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
+            rows = session.execute(
+                select(
+                    FlowHistory.flow_id,
+                    day,
+                    func.count(FlowHistory.id),
+                    func.sum(case((is_completed, 1), else_=0)),
+                    func.sum(case((FlowHistory.status == 'failed', 1), else_=0)),
+                    *[
+                        func.sum(case((and_(has_duration, bucket == index), 1), else_=0))
+                        for index in range(len(DURATION_BUCKET_LABELS))
+                    ]
+                ).where(
+                    FlowHistory.created_at >= start,
+                    FlowHistory.created_at < end
+                ).group_by(FlowHistory.flow_id, day).having(
+                    func.sum(case((FlowHistory.status.in_(('pending', 'running')), 1), else_=0)) == 0
+                )
+            ).all()
+            if not rows:
+                return 0
+
+            result = session.execute(
+                sqlite_insert(FlowDailyStats).values([
+                    {
+                        'flow_id': flow_id,
+                        'day': day_value,
+                        'total': total,
+                        'completed': completed,
+                        'failed': failed,
+                        'duration_counts': ','.join(str(c) for c in durations)
+                    }
+                    for flow_id, day_value, total, completed, failed, *durations in rows
+                ]).on_conflict_do_nothing()
+            )
+            session.commit()
+            return result.rowcount
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
 
-            histories = session.query(FlowHistory).filter(
-                FlowHistory.flow_id == flow_id,
-                FlowHistory.created_at >= start_date,
-                FlowHistory.created_at <= end_date
-            ).order_by(FlowHistory.created_at).all()
+    @staticmethod
+    def _compute_flow_chart_data(flow_id: str, days: int, window: datetime) -> Dict:
+        """从数据库统计Flow图表数据
 
-            # 按日期分组统计
-            daily_stats = {}
-            status_over_time = {
-                'completed': [],
-                'failed': [],
-                'pending': [],
-                'running': []
+        已汇总的日期从每日汇总表读取，其余日期通过 GROUP BY 聚合查询实时统计；
+        汇总表由每日维护任务写入，此处只读
+        """
+        session = get_session()
+        try:
+            # 统计范围：最近 days 天（按整天计算，含基准日期当天）
+            end_date = datetime.now()
+            today = window.date()
+            start_day = today - timedelta(days=days)
+            # 状态到统计字段的映射
+            status_keys = {
+                'completed': 'success',
+                'failed': 'failed',
+                'pending': 'pending',
+                'running': 'running'
             }
 
-            # 初始化日期范围
-            current_date = start_date.date()
-            while current_date <= end_date.date():
-                daily_stats[current_date.strftime('%Y-%m-%d')] = {
+            # 按日期分组统计（以日期序数为键）
+            daily_stats = {}
+            for ordinal in range(start_day.toordinal(), today.toordinal() + 1):
+                daily_stats[ordinal] = {
                     'total': 0,
                     'success': 0,
                     'failed': 0,
                     'pending': 0,
-                    'running': 0
+                    'running': 0,
+                    'durations': [0] * len(DURATION_BUCKET_LABELS)
                 }
-                current_date += timedelta(days=1)
 
-            # 统计每日数据
-            for history in histories:
-                date_key = history.created_at.strftime('%Y-%m-%d')
-                if date_key in daily_stats:
-                    daily_stats[date_key]['total'] += 1
-                    if history.status == 'completed':
-                        daily_stats[date_key]['success'] += 1
-                    elif history.status == 'failed':
-                        daily_stats[date_key]['failed'] += 1
-                    elif history.status == 'pending':
-                        daily_stats[date_key]['pending'] += 1
-                    elif history.status == 'running':
-                        daily_stats[date_key]['running'] += 1
+            # 读取已汇总的日期
+            summarized = set()
+            for rollup in session.query(FlowDailyStats).filter(
+                FlowDailyStats.flow_id == flow_id,
+                FlowDailyStats.day >= start_day.isoformat(),
+                FlowDailyStats.day < today.isoformat()
+            ).all():
+                ordinal = date.fromisoformat(rollup.day).toordinal()
+                daily_stats[ordinal].update(
+                    total=rollup.total,
+                    success=rollup.completed,
+                    failed=rollup.failed,
+                    durations=[int(c) for c in rollup.duration_counts.split(',')]
+                )
+                summarized.add(ordinal)
+
+            # 从第一个未汇总的日期开始实时统计
+            live_from = next(o for o in daily_stats if o not in summarized)
+            in_range = and_(
+                FlowHistory.flow_id == flow_id,
+                FlowHistory.created_at >= datetime.combine(date.fromordinal(live_from), datetime.min.time()),
+                FlowHistory.created_at <= end_date
+            )
+            live = {o: stats for o, stats in daily_stats.items() if o >= live_from and o not in summarized}
+
+            day = func.date(FlowHistory.created_at)
+            daily_rows = session.query(day, FlowHistory.status, func.count(FlowHistory.id)).filter(
+                in_range
+            ).group_by(day, FlowHistory.status).all()
+
+            for day_value, status, count in daily_rows:
+                stats = live.get(date.fromisoformat(day_value).toordinal())
+                if stats is None:
+                    continue
+                stats['total'] += count
+                if status in status_keys:
+                    stats[status_keys[status]] += count
+
+            # 执行时长分布：在SQL中按时长计算分组序号
+            bucket = _duration_bucket()
+            duration_rows = session.query(day, bucket, func.count(FlowHistory.id)).filter(
+                in_range,
+                FlowHistory.status == 'completed',
+                FlowHistory.duration_seconds.isnot(None)
+            ).group_by(day, bucket).all()
+
+            for day_value, index, count in duration_rows:
+                stats = live.get(date.fromisoformat(day_value).toordinal())
+                if stats is not None:
+                    stats['durations'][index] = count
 
             # 准备图表数据
-            dates = list(daily_stats.keys())
-            success_data = [daily_stats[d]['success'] for d in dates]
-            failed_data = [daily_stats[d]['failed'] for d in dates]
-
-            # 执行时长分布
-            durations = []
-            for h in histories:
-                if h.status == 'completed' and h.start_time and h.end_time:
-                    duration = (h.end_time - h.start_time).total_seconds() / 60  # 转换为分钟
-                    durations.append(duration)
-
-            # 按时长分组
-            duration_ranges = {
-                '< 1分钟': 0,
-                '1-5分钟': 0,
-                '5-15分钟': 0,
-                '15-60分钟': 0,
-                '> 60分钟': 0
-            }
+            ordinals = list(daily_stats.keys())
+            dates = [date.fromordinal(o).isoformat() for o in ordinals]
+            success_data = [daily_stats[o]['success'] for o in ordinals]
+            failed_data = [daily_stats[o]['failed'] for o in ordinals]
+
+            counts = [sum(column) for column in zip(*(stats['durations'] for stats in daily_stats.values()))]
+            duration_ranges = dict(zip(DURATION_BUCKET_LABELS, counts))
 
-            for duration in durations:
-                if duration < 1:
-                    duration_ranges['< 1分钟'] += 1
-                elif duration < 5:
-                    duration_ranges['1-5分钟'] += 1
-                elif duration < 15:
-                    duration_ranges['5-15分钟'] += 1
-                elif duration < 60:
-                    duration_ranges['15-60分钟'] += 1
-                else:
-                    duration_ranges['> 60分钟'] += 1
-
-            # 每小时执行分布（最近7天，按小时统计成功和失败）
+            # 每小时执行分布（基准时间之前7天，按小时统计成功和失败）
             hourly_stats = {}
             for hour in range(24):
                 hourly_stats[hour] = {'success': 0, 'failed': 0, 'pending': 0, 'running': 0, 'total': 0}
 
-            # 获取最近7天的执行记录，按小时统计
-            recent_histories = session.query(FlowHistory).filter(
+            hour_of_day = func.strftime('%H', FlowHistory.created_at)
+            hourly_rows = session.query(hour_of_day, FlowHistory.status, func.count(FlowHistory.id)).filter(
                 FlowHistory.flow_id == flow_id,
-                FlowHistory.created_at >= datetime.now() - timedelta(days=7)
-            ).all()
-
-            for history in recent_histories:
-                hour = history.created_at.hour
-                hourly_stats[hour]['total'] += 1
-                if history.status == 'completed':
-                    hourly_stats[hour]['success'] += 1
-                elif history.status == 'failed':
-                    hourly_stats[hour]['failed'] += 1
-                elif history.status == 'pending':
-                    hourly_stats[hour]['pending'] += 1
-                elif history.status == 'running':
-                    hourly_stats[hour]['running'] += 1
+                FlowHistory.created_at >= window - timedelta(days=7)
+            ).group_by(hour_of_day, FlowHistory.status).all()
+
+            for hour_value, status, count in hourly_rows:
+                stats = hourly_stats[int(hour_value)]
+                stats['total'] += count
+                if status in status_keys:
+                    stats[status_keys[status]] += count
 
             return {
                 'daily_trend': {
@@ -4,40 +4,289 @@
 
 import logging
 import os
-import glob
+import itertools
+import queue
+import re
+import threading
+import time
+from concurrent import futures
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
 
+from apscheduler.events import EVENT_JOB_REMOVED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
+from sqlalchemy import delete, func, insert, select, update
 
-from flowy.core.db import get_session, Trigger, FlowHistory, TaskHistory
+from flowy.core.cache import invalidate_flow_caches, running_gauge, trigger_cache, trigger_detail_cache
+from flowy.core.config import get_config
+from flowy.core.db import session_scope, Trigger, FlowHistory, TaskHistory
 from flowy.core.flow import execute_flow
+from flowy.web.services.flow_service import FlowService
 from flowy.core.json_utils import json
 
 logger = logging.getLogger(__name__)
 
+# 空输入的序列化结果，即时任务大多不带参数，直接复用
+_EMPTY_JSON = json.dumpb({})
+
+
+def _error_output(error: str, **extra) -> bytes:
+    """序列化写入 output_data 的错误信息，结构固定且较小，使用紧凑格式不缩进"""
+    return json.dumpb({'error': error, **extra}, option=0)
+
+
+@dataclass(slots=True)
+class TriggerSnapshot:
+    """触发器执行所需字段的快照，trigger_params 已预先解析"""
+    id: int
+    name: str
+    flow_id: str
+    enabled: bool
+    trigger_params: Dict[str, Any]
+
+    @classmethod
+    def from_trigger(cls, trigger) -> 'TriggerSnapshot':
+        """由触发器对象或包含相同字段的查询结果行构建快照"""
+        trigger_params = {}
+        if trigger.trigger_params:
+            try:
+                trigger_params = json.loads(trigger.trigger_params)
+            except Exception as e:
+                logger.error(f"解析触发参数失败 {trigger.id}: {e}")
+        return cls(
+            id=trigger.id,
+            name=trigger.name,
+            flow_id=trigger.flow_id,
+            enabled=bool(trigger.enabled),
+            trigger_params=trigger_params
+        )
+
+
+def _cron_trigger(cron_expression: str) -> CronTrigger:
+    """解析Cron表达式，相同表达式复用同一个 CronTrigger 对象
+
+    表达式先规整空白，并使用配置的调度器时区，使写法不同但等价的表达式命中同一缓存。
+    CronTrigger 不保存运行状态，可以被多个任务共享；复用同一对象也使
+    load_triggers_from_db 能以对象身份判断任务的 cron 是否变化。
+    """
+    return _parse_cron(' '.join(cron_expression.split()), get_config().scheduler_timezone)
+
+
+@lru_cache(maxsize=1024)
+def _parse_cron(cron_expression: str, timezone: Optional[str]) -> CronTrigger:
+    return CronTrigger.from_crontab(cron_expression, timezone=timezone)
+
+
+def _poll_jitter(interval_seconds: int) -> int:
+    """周期维护任务的随机延迟上限（秒），避免与整点触发的任务同时唤醒"""
+    return min(interval_seconds // 4, 15)
+
+
+def _elapsed_seconds(start, end):
+    """以 SQL 计算两个时间之间的秒数（精确到毫秒），任一为 NULL 时结果为 NULL"""
+    return func.round((func.julianday(end) - func.julianday(start)) * 86400, 3)
+
+
+# 触发器同步各操作的日志名称
+_SYNC_ACTION_NAMES = {'added': '添加', 'updated': '更新', 'resumed': '恢复', 'paused': '暂停'}
+
+# 触发器最大并发实例数，旧数据为空时按 1 处理
+_MAX_INSTANCES = func.coalesce(Trigger.max_instances, 1).label('max_instances')
+
+
+def _trigger_watermark(session) -> tuple:
+    """触发器表的 (MAX(updated_at), COUNT(*))，任一变化说明触发器有增删改"""
+    return tuple(session.execute(select(func.max(Trigger.updated_at), func.count(Trigger.id))).one())
+
+
+def _trigger_fingerprint(cron_expression: str, flow_id: str, max_instances: int, name: Optional[str],
+                         trigger_params: Optional[Dict[str, Any]]) -> tuple:
+    """触发器任务的配置指纹，cron 表达式位于首位，便于判断是否只有 cron 变化"""
+    return (' '.join(cron_expression.split()), flow_id, max_instances, name, trigger_params)
+
+
+def _trigger_metadata(trigger_id: int, name: Optional[str]) -> Dict[str, Any]:
+    """构建定时触发的执行元数据"""
+    return {
+        'trigger_id': trigger_id,
+        'trigger_name': name,
+        'trigger_type': 'scheduled'
+    }
+
+
+def _trigger_job_args(trigger_id: int, flow_id: str, name: Optional[str],
+                      trigger_params: Optional[Dict[str, Any]]) -> list:
+    """构建触发器调度任务的参数列表，未提供已解析参数时只传 trigger_id
+
+    执行元数据在添加任务时一次构建，每次触发复用同一个字典（execute_flow 只读取元数据）。
+    """
+    if trigger_params is None:
+        return [trigger_id]
+    return [trigger_id, flow_id, _trigger_metadata(trigger_id, name), trigger_params]
+
+
+_log_cleanup_pool: Optional[futures.ThreadPoolExecutor] = None
+_log_cleanup_pool_lock = threading.Lock()
+
+
+def _get_log_cleanup_pool() -> futures.ThreadPoolExecutor:
+    """获取清理日志文件的线程池，首次使用时创建"""
+    global _log_cleanup_pool
+    if _log_cleanup_pool is None:
+        with _log_cleanup_pool_lock:
+            if _log_cleanup_pool is None:
+                _log_cleanup_pool = futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix='flowy-log-cleanup')
+    return _log_cleanup_pool
+
+
+# 执行历史日志文件名，见 flowy.core.logger.get_flow_logger
+_HISTORY_LOG_RE = re.compile(r'flow-history-(\d+)\.log')
+
+
+def _remove_expired_log(entry: os.DirEntry, cutoff_ts: float, min_history_id: Optional[int] = None) -> int:
+    """删除修改时间早于 cutoff_ts 的日志文件
+
+    执行历史日志的文件名包含历史记录ID，ID 小于 min_history_id（现存最小ID）时
+    对应记录已被清理，无需读取修改时间直接删除。
+
+    Returns:
+        删除时返回 1，否则返回 0
+    """
+    try:
+        match = _HISTORY_LOG_RE.fullmatch(entry.name)
+        if match is not None and min_history_id is not None and int(match.group(1)) < min_history_id:
+            expired = True
+        else:
+            # 如果文件超过保留天数，删除
+            expired = entry.stat(follow_symlinks=False).st_mtime < cutoff_ts
+        if expired:
+            os.remove(entry.path)
+            logger.info(f"删除过期日志文件: {entry.path}")
+            return 1
+    except Exception as e:
+        logger.error(f"删除日志文件失败 {entry.path}: {e}")
+    return 0
+
+
+class _PendingHistoryWriter:
+    """pending 状态 FlowHistory 的合并写入线程
+
+    调用方提交行数据后等待返回的 Future。写入线程每次取出队列中已积压的
+    全部请求（最多 max_batch 条），用一次 executemany INSERT ... RETURNING
+    写入并提交；并发提交的即时任务因此合并为一次事务。队列为空时不额外等待，
+    单个请求不会被延迟。调用方等待超时后可取消 Future，尚未开始写入的请求不再写入。
+    """
+
+    def __init__(self, max_batch: int = 256, max_queue: int = 4096):
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, row: Dict[str, Any]) -> futures.Future:
+        """提交一行待写入数据，Future 的结果为新记录ID"""
+        self._ensure_started()
+        future = futures.Future()
+        self._queue.put((row, future))
+        return future
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='flowy-history-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._write(self._take_batch())
+
+    def _take_batch(self) -> list:
+        """阻塞取出一个请求，再取出队列中已积压的请求，最多 max_batch 条"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _write(batch):
+        # 标记为执行中后调用方无法再取消；已被取消的请求直接丢弃
+        batch = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            with session_scope() as session:
+                stmt = insert(FlowHistory).returning(FlowHistory.id, sort_by_parameter_order=True)
+                ids = session.scalars(stmt, [row for row, _ in batch]).all()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), flow_history_id in zip(batch, ids):
+            future.set_result(flow_history_id)
+
+
+_history_writer = _PendingHistoryWriter()
+
+# 等待写入线程创建历史记录的最长时间（秒）
+_HISTORY_WRITE_TIMEOUT = 30
+
 
 class SchedulerService:
     """调度服务类"""
     
     _scheduler: Optional[BackgroundScheduler] = None
     _scheduler_started: bool = False
+    # 由 add_job 添加的触发器任务：trigger_id -> (配置指纹, 是否启用)，由 add_job/remove_job/
+    # pause_job/resume_job 维护；重载和同步时直接对比指纹，无需扫描调度器任务或反射 CronTrigger 字段
+    _trigger_fingerprints: Dict[int, Tuple[tuple, bool]] = {}
+    # 孤儿任务检查、触发器同步等周期任务连续空闲的次数，用于退避调整执行间隔
+    _idle_ticks: Dict[str, int] = {}
+    _MAX_POLL_INTERVAL = 300
+    # 上次完整同步时触发器表的 (MAX(updated_at), COUNT(*))，未变化时跳过同步
+    _sync_watermark: Optional[tuple] = None
+    # 进行中的触发器重载，并发调用者等待同一次重载完成
+    _reload_lock = threading.Lock()
+    _reload_inflight: Optional[futures.Future] = None
+    # 无需延迟的即时任务直接提交到该线程池，不经过调度器轮询
+    _immediate_pool: Optional[futures.ThreadPoolExecutor] = None
+    # 已提交到线程池但尚未执行结束的即时任务：job_id -> flow_history_id
+    _immediate_inflight: Dict[str, int] = {}
+    # 以 DateTrigger 加入调度器、尚未移除的即时任务：job_id -> flow_history_id，任务移除时由事件监听清除
+    _scheduled_immediate_jobs: Dict[str, int] = {}
+    _immediate_lock = threading.Lock()
+    _immediate_id_counter = itertools.count(1)
     
     @classmethod
     def init_scheduler(cls):
         """初始化调度器"""
         if cls._scheduler is None:
-            from flowy.core.config import get_config
-
             config = get_config()
+            # 孤儿检查、触发器同步、历史清理等维护任务使用独立线程池，不占用工作流执行的线程
             executors = {
-                'default': ThreadPoolExecutor(max_workers=config.scheduler_max_workers)
+                'default': ThreadPoolExecutor(max_workers=config.scheduler_max_workers),
+                'maintenance': ThreadPoolExecutor(max_workers=2)
+            }
+
+            # 触发器以 Trigger 表为准，启动时由 load_triggers_from_db 重建；即时任务的
+            # 执行记录已写入 FlowHistory。任务只保存在内存中，不再持久化到数据库
+            jobstores = {
+                'default': MemoryJobStore()
             }
 
             cls._scheduler = BackgroundScheduler(
+                jobstores=jobstores,
                 executors=executors,
                 timezone=config.scheduler_timezone,
                 job_defaults={
@@ -45,9 +294,11 @@ class SchedulerService:
                     'max_instances': 1  # 同一任务最多1个实例
                 }
             )
+            # DateTrigger 任务执行后或错过执行时会被调度器移除，此时清除即时任务登记
+            cls._scheduler.add_listener(cls._on_job_removed, EVENT_JOB_REMOVED)
             logger.info(
                 f"调度器已初始化: max_workers={config.scheduler_max_workers}, "
-                f"timezone={config.scheduler_timezone}"
+                f"timezone={cls._scheduler.timezone}"
             )
     
     @classmethod
@@ -69,6 +320,9 @@ class SchedulerService:
             # 添加历史数据清理定时任务（每天0点执行，需配置启用）
             cls.add_history_cleanup_job()
 
+            # 添加每日统计汇总定时任务（每天1点执行）
+            cls.add_daily_stats_rollup_job()
+
     @classmethod
     def add_orphaned_job_checker(cls, interval_seconds: int = 30):
         """添加孤儿任务检查定时任务
@@ -85,12 +339,16 @@ class SchedulerService:
         if cls._scheduler.get_job(job_id):
             cls._scheduler.remove_job(job_id)
 
+        cls._idle_ticks.pop(job_id, None)
         cls._scheduler.add_job(
-            func=cls.check_orphaned_jobs,
+            func=cls._run_orphaned_job_checker,
             trigger='interval',
             seconds=interval_seconds,
+            jitter=_poll_jitter(interval_seconds),
             id=job_id,
+            args=[interval_seconds],
             name='孤儿任务检查器',
+            executor='maintenance',
             replace_existing=True
         )
         logger.info(f"添加孤儿任务检查定时任务，间隔: {interval_seconds}秒")
@@ -113,16 +371,67 @@ class SchedulerService:
         if cls._scheduler.get_job(job_id):
             cls._scheduler.remove_job(job_id)
 
+        cls._idle_ticks.pop(job_id, None)
         cls._scheduler.add_job(
-            func=cls.sync_triggers_from_db,
+            func=cls._run_trigger_syncer,
             trigger='interval',
             seconds=interval_seconds,
+            jitter=_poll_jitter(interval_seconds),
             id=job_id,
+            args=[interval_seconds],
             name='触发器同步器',
+            executor='maintenance',
             replace_existing=True
         )
         logger.info(f"添加触发器同步定时任务，间隔: {interval_seconds}秒")
 
+    @classmethod
+    def notify_triggers_changed(cls):
+        """通知触发器已变化，立即唤醒触发器同步任务
+
+        由触发器的增删改操作在提交后调用，变化无需等待下一个同步周期即可生效；
+        同时清除同步间隔的退避状态。周期同步仍保留，用于发现其他进程直接修改的触发器。
+        """
+        if cls._scheduler is None or not cls._scheduler_started:
+            return
+
+        job_id = 'trigger_syncer'
+        cls._idle_ticks.pop(job_id, None)
+        try:
+            cls._scheduler.modify_job(job_id, next_run_time=datetime.now(cls._scheduler.timezone))
+        except JobLookupError:
+            pass
+
+    @classmethod
+    def _run_orphaned_job_checker(cls, interval_seconds: int):
+        """定时执行孤儿任务检查，连续无孤儿任务时逐步延长检查间隔"""
+        result = cls.check_orphaned_jobs()
+        cls._adapt_poll_interval('orphaned_job_checker', interval_seconds, busy=any(result.values()))
+
+    @classmethod
+    def _run_trigger_syncer(cls, interval_seconds: int):
+        """定时执行触发器同步，连续无变化时逐步延长同步间隔"""
+        result = cls.sync_triggers_from_db()
+        busy = result is None or any(v for k, v in result.items() if k != 'unchanged')
+        cls._adapt_poll_interval('trigger_syncer', interval_seconds, busy=busy)
+
+    @classmethod
+    def _adapt_poll_interval(cls, job_id: str, base_seconds: int, busy: bool):
+        """根据本次执行是否有工作调整周期任务的间隔
+
+        连续空闲时间隔按 base_seconds 指数增长，最长 _MAX_POLL_INTERVAL 秒；
+        一旦有工作立即恢复为 base_seconds。间隔不变时不改动调度器。
+        """
+        idle_ticks = 0 if busy else cls._idle_ticks.get(job_id, 0) + 1
+        cls._idle_ticks[job_id] = idle_ticks
+        seconds = max(base_seconds, min(cls._MAX_POLL_INTERVAL, base_seconds * 2 ** min(idle_ticks, 4)))
+
+        job = cls._scheduler.get_job(job_id) if cls._scheduler else None
+        if job is None or job.trigger.interval.total_seconds() == seconds:
+            return
+        cls._scheduler.reschedule_job(job_id, trigger='interval', seconds=seconds, jitter=_poll_jitter(seconds))
+        logger.debug(f"调整定时任务间隔: {job_id}, {seconds}秒")
+
     @classmethod
     def cleanup_history_data(cls, retention_days: Optional[int] = None):
         """清理过期的历史数据
@@ -135,87 +444,98 @@ class SchedulerService:
         Returns:
             清理结果统计字典
         """
-        from flowy.core.config import get_config
+        config = get_config()
 
         # 获取保留天数
         if retention_days is None:
-            retention_days = get_config().history_retention_days
+            retention_days = config.history_retention_days
 
-        session = get_session()
         now = datetime.now()
         cutoff_date = now - timedelta(days=retention_days)
 
         try:
-            result = {
-                'flow_history_deleted': 0,
-                'task_history_deleted': 0,
-                'log_files_deleted': 0,
-                'retention_days': retention_days,
-                'cutoff_date': cutoff_date.isoformat()
-            }
-
-            # 1. 删除过期的 FlowHistory 记录
-            expired_flows = session.query(FlowHistory).filter(
-                FlowHistory.created_at < cutoff_date
-            ).all()
+            with session_scope() as session:
+                result = {
+                    'flow_history_deleted': 0,
+                    'task_history_deleted': 0,
+                    'log_files_deleted': 0,
+                    'retention_days': retention_days,
+                    'cutoff_date': cutoff_date.isoformat()
+                }
 
-            # 收集需要删除的 flow_history_id
-            flow_history_ids = [f.id for f in expired_flows]
+                # 1. 删除过期的 FlowHistory 记录，直接执行批量 DELETE，不加载到内存；
+                # 每批最多 batch_size 条并单独提交，避免长时间持有写锁
+                batch_size = config.history_cleanup_batch_size
+                deleted_flows = deleted_tasks = 0
+                while True:
+                    # 本批ID以子查询表达而非绑定ID列表，批次大小不受 SQLite 单条语句参数数量的限制
+                    batch_ids = select(FlowHistory.id).where(
+                        FlowHistory.created_at < cutoff_date
+                    ).order_by(FlowHistory.id).limit(batch_size)
+
+                    # 先删除关联的 TaskHistory
+                    deleted_tasks += session.execute(
+                        delete(TaskHistory)
+                        .where(TaskHistory.flow_history_id.in_(batch_ids))
+                        .execution_options(synchronize_session=False)
+                    ).rowcount
+
+                    # 再删除 FlowHistory
+                    batch_deleted = session.execute(
+                        delete(FlowHistory)
+                        .where(FlowHistory.id.in_(batch_ids))
+                        .execution_options(synchronize_session=False)
+                    ).rowcount
+                    session.commit()
+                    deleted_flows += batch_deleted
+
+                    if batch_deleted < batch_size:
+                        break
+                    # 批次之间让出CPU，使其他写入有机会获得锁
+                    time.sleep(0)
 
-            if flow_history_ids:
-                # 先删除关联的 TaskHistory
-                deleted_tasks = session.query(TaskHistory).filter(
-                    TaskHistory.flow_history_id.in_(flow_history_ids)
-                ).delete(synchronize_session=False)
                 result['task_history_deleted'] = deleted_tasks
+                result['flow_history_deleted'] = deleted_flows
+                if deleted_flows or deleted_tasks:
+                    invalidate_flow_caches()
+                    logger.info(f"清理历史数据: 删除 {deleted_flows} 条 FlowHistory, {deleted_tasks} 条 TaskHistory")
+
+                # 2. 清理过期的日志文件
+                log_dir = config.log_dir
+                if os.path.exists(log_dir):
+                    # 用 scandir 遍历 .log 文件，复用目录项中的文件类型与 stat 信息；
+                    # stat 与删除为IO系统调用，在线程池中并行执行
+                    cutoff_ts = cutoff_date.timestamp()
+                    # 历史记录已清理完毕，小于现存最小ID的执行历史日志可按文件名直接判定过期
+                    min_history_id = session.scalar(select(func.min(FlowHistory.id)))
+                    with os.scandir(log_dir) as it:
+                        log_entries = (
+                            entry for entry in it
+                            if entry.name.endswith('.log') and entry.is_file(follow_symlinks=False)
+                        )
+                        result['log_files_deleted'] = sum(
+                            _get_log_cleanup_pool().map(
+                                lambda entry: _remove_expired_log(entry, cutoff_ts, min_history_id), log_entries
+                            )
+                        )
+
+                # 记录清理结果
+                total_deleted = result['flow_history_deleted'] + result['task_history_deleted'] + result['log_files_deleted']
+                if total_deleted > 0:
+                    logger.info(
+                        f"历史数据清理完成: FlowHistory={result['flow_history_deleted']}, "
+                        f"TaskHistory={result['task_history_deleted']}, "
+                        f"日志文件={result['log_files_deleted']}, "
+                        f"保留天数={retention_days}天"
+                    )
+                else:
+                    logger.debug(f"历史数据清理完成，无需删除数据 (保留天数={retention_days}天)")
 
-                # 再删除 FlowHistory
-                for flow in expired_flows:
-                    session.delete(flow)
-                result['flow_history_deleted'] = len(expired_flows)
-
-                session.commit()
-                logger.info(f"清理历史数据: 删除 {len(expired_flows)} 条 FlowHistory, {deleted_tasks} 条 TaskHistory")
-
-            # 2. 清理过期的日志文件
-            log_dir = get_config().log_dir
-            if os.path.exists(log_dir):
-                # 查找所有 .log 文件
-                log_files = glob.glob(os.path.join(log_dir, '*.log'))
-
-                for log_file in log_files:
-                    try:
-                        # 获取文件修改时间
-                        file_mtime = datetime.fromtimestamp(os.path.getmtime(log_file))
-
-                        # 如果文件超过保留天数，删除
-                        if file_mtime < cutoff_date:
-                            os.remove(log_file)
-                            result['log_files_deleted'] += 1
-                            logger.info(f"删除过期日志文件: {log_file}")
-                    except Exception as e:
-                        logger.error(f"删除日志文件失败 {log_file}: {e}")
-
-            # 记录清理结果
-            total_deleted = result['flow_history_deleted'] + result['task_history_deleted'] + result['log_files_deleted']
-            if total_deleted > 0:
-                logger.info(
-                    f"历史数据清理完成: FlowHistory={result['flow_history_deleted']}, "
-                    f"TaskHistory={result['task_history_deleted']}, "
-                    f"日志文件={result['log_files_deleted']}, "
-                    f"保留天数={retention_days}天"
-                )
-            else:
-                logger.debug(f"历史数据清理完成，无需删除数据 (保留天数={retention_days}天)")
-
-            return result
+                return result
 
         except Exception as e:
-            session.rollback()
             logger.error(f"清理历史数据时发生错误: {e}")
             return None
-        finally:
-            session.close()
 
     @classmethod
     def add_history_cleanup_job(cls, retention_days: Optional[int] = None):
@@ -226,8 +546,6 @@ class SchedulerService:
         Args:
             retention_days: 保留天数，如果不指定则从配置读取
         """
-        from flowy.core.config import get_config
-
         if cls._scheduler is None:
             return
 
@@ -242,8 +560,8 @@ class SchedulerService:
         if cls._scheduler.get_job(job_id):
             cls._scheduler.remove_job(job_id)
 
-        # 使用 cron 表达式：每天0点执行
-        trigger = CronTrigger.from_crontab('0 0 * * *')
+        # 每天0点执行，随机延迟最多5分钟，避免多个节点同时清理
+        trigger = CronTrigger(hour=0, minute=0, jitter=300, timezone=get_config().scheduler_timezone)
 
         cls._scheduler.add_job(
             func=cls.cleanup_history_data,
@@ -251,53 +569,212 @@ class SchedulerService:
             id=job_id,
             args=[retention_days] if retention_days else [],
             name='历史数据清理器',
+            executor='maintenance',
             replace_existing=True
         )
 
         days = retention_days or get_config().history_retention_days
         logger.info(f"添加历史数据清理定时任务，每天0点执行，保留{days}天数据")
     
+    @classmethod
+    def rollup_daily_stats(cls):
+        """汇总保留天数内已结束日期的执行统计，供图表查询读取"""
+        try:
+            count = FlowService.rollup_daily_stats(get_config().history_retention_days)
+            if count:
+                logger.info(f"每日统计汇总完成: 新增 {count} 条")
+            return count
+        except Exception as e:
+            logger.error(f"汇总每日统计时发生错误: {e}")
+            return None
+
+    @classmethod
+    def add_daily_stats_rollup_job(cls):
+        """添加每日统计汇总定时任务
+
+        每天1点执行一次，在历史数据清理之后汇总前一天及更早的执行统计。
+        """
+        if cls._scheduler is None:
+            return
+
+        # 随机延迟最多5分钟，避免多个节点同时汇总
+        trigger = CronTrigger(hour=1, minute=0, jitter=300, timezone=get_config().scheduler_timezone)
+
+        cls._scheduler.add_job(
+            func=cls.rollup_daily_stats,
+            trigger=trigger,
+            id='daily_stats_rollup',
+            name='每日统计汇总器',
+            executor='maintenance',
+            replace_existing=True
+        )
+        logger.info("添加每日统计汇总定时任务，每天1点执行")
+
     @classmethod
     def shutdown_scheduler(cls):
         """关闭调度器"""
         if cls._scheduler and cls._scheduler_started:
             cls._scheduler.shutdown(wait=False)
+            if cls._immediate_pool is not None:
+                cls._immediate_pool.shutdown(wait=False)
+                cls._immediate_pool = None
+            with cls._immediate_lock:
+                cls._scheduled_immediate_jobs.clear()
             cls._scheduler_started = False
             logger.info("调度器已关闭")
     
     @classmethod
-    def add_job(cls, trigger_id: int, flow_id: str, cron_expression: str, max_instances: int = 1):
+    def add_job(cls, trigger_id: int, flow_id: str, cron_expression: str, max_instances: int = 1,
+                name: Optional[str] = None, trigger_params: Optional[Dict[str, Any]] = None):
         """添加调度任务
 
+        提供 trigger_params 时，触发器名称和已解析的参数随任务参数一起保存，
+        触发时无需再读取数据库或解析 JSON。
+
         Args:
             trigger_id: 触发器ID
             flow_id: 工作流ID
             cron_expression: Cron表达式
             max_instances: 最大并发实例数，默认1
+            name: 触发器名称（可选）
+            trigger_params: 已解析的触发参数（可选），为 None 时触发时读取触发器快照
         """
         if cls._scheduler is None:
             raise RuntimeError("调度器未初始化")
 
         job_id = f"trigger_{trigger_id}"
 
-        # 检查任务是否已存在，避免重复添加
-        if cls._scheduler.get_job(job_id):
-            logger.warning(f"调度任务已存在，将替换: {job_id}")
+        # 已存在的任务由 replace_existing 直接替换，这里只查本地指纹，不访问 jobstore
+        if trigger_id in cls._trigger_fingerprints:
+            logger.debug(f"调度任务已存在，将替换: {job_id}")
 
-        trigger = CronTrigger.from_crontab(cron_expression)
+        trigger = _cron_trigger(cron_expression)
 
         cls._scheduler.add_job(
             func=cls.execute_trigger,
             trigger=trigger,
             id=job_id,
-            args=[trigger_id],
+            args=_trigger_job_args(trigger_id, flow_id, name, trigger_params),
             replace_existing=True,  # 确保替换现有任务
             misfire_grace_time=30,  # 允许30秒的误差时间
             coalesce=True,  # 合并错过的执行
             max_instances=max_instances  # 根据触发器配置设置最大实例数
         )
+        cls._trigger_fingerprints[trigger_id] = (
+            _trigger_fingerprint(cron_expression, flow_id, max_instances, name, trigger_params), True
+        )
         logger.info(f"添加调度任务: {job_id}, cron: {cron_expression}, max_instances: {max_instances}")
     
+    @classmethod
+    def add_trigger_job(cls, trigger):
+        """根据触发器记录添加调度任务，同时刷新触发器快照
+
+        Args:
+            trigger: 触发器对象，或包含相同字段的查询结果行
+        """
+        snapshot = TriggerSnapshot.from_trigger(trigger)
+        trigger_cache.set(trigger.id, snapshot)
+        cls.add_job(
+            trigger.id,
+            trigger.flow_id,
+            trigger.cron_expression,
+            max_instances=getattr(trigger, 'max_instances', 1) or 1,
+            name=snapshot.name,
+            trigger_params=snapshot.trigger_params
+        )
+
+    @classmethod
+    def refresh_trigger_job(cls, trigger):
+        """按触发器的最新配置更新调度任务，配置未变化时不改动调度器
+
+        Args:
+            trigger: 已启用的触发器对象，或包含相同字段的查询结果行
+        """
+        current = cls._trigger_fingerprints.get(trigger.id)
+        if current is None:
+            cls.add_trigger_job(trigger)
+            return
+
+        snapshot = TriggerSnapshot.from_trigger(trigger)
+        trigger_cache.set(trigger.id, snapshot)
+        fingerprint = _trigger_fingerprint(
+            trigger.cron_expression, trigger.flow_id, getattr(trigger, 'max_instances', 1) or 1,
+            snapshot.name, snapshot.trigger_params
+        )
+        if current[0] != fingerprint:
+            cls._update_trigger_job(trigger, current, fingerprint)
+        elif not current[1]:
+            cls.resume_job(trigger.id)
+        else:
+            logger.debug(f"调度任务配置未变化: trigger_{trigger.id}")
+
+    @classmethod
+    def _update_trigger_job(cls, trigger, current: Tuple[tuple, bool], fingerprint: tuple):
+        """按变化的字段更新已存在的触发器任务
+
+        只有 cron 或 max_instances 变化时原地改期或修改任务，保留任务对象；
+        flow_id、名称或触发参数变化时任务参数需要重建，重新添加任务。
+
+        Args:
+            trigger: 触发器对象，或包含相同字段的查询结果行
+            current: 任务当前的 (配置指纹, 是否启用)
+            fingerprint: 触发器的新配置指纹
+        """
+        old = current[0]
+        if old[1] != fingerprint[1] or old[3:] != fingerprint[3:]:
+            cls.add_trigger_job(trigger)
+            return
+
+        job_id = f"trigger_{trigger.id}"
+        if old[2] != fingerprint[2]:
+            cls._scheduler.modify_job(job_id, max_instances=fingerprint[2])
+            logger.info(f"修改调度任务: {job_id}, max_instances: {fingerprint[2]}")
+        if old[0] != fingerprint[0]:
+            # reschedule_job 同时会恢复已暂停的任务
+            cls._scheduler.reschedule_job(job_id, trigger=_cron_trigger(trigger.cron_expression))
+            logger.info(f"重新调度任务: {job_id}, cron: {trigger.cron_expression}")
+        elif not current[1]:
+            cls._scheduler.resume_job(job_id)
+        cls._trigger_fingerprints[trigger.id] = (fingerprint, True)
+
+    @classmethod
+    def _get_managed_trigger_jobs(cls) -> Dict[int, Any]:
+        """获取当前受管理的触发器任务，键为 trigger_id；已不在调度器中的会被清除"""
+        # 一次性获取所有任务并按ID索引，避免逐个 get_job 反复获取 jobstore 锁
+        jobs_by_id = {job.id: job for job in cls._scheduler.get_jobs()}
+        fingerprints = cls._trigger_fingerprints
+        jobs = {}
+        for trigger_id in list(fingerprints):
+            job = jobs_by_id.get(f"trigger_{trigger_id}")
+            if job is None:
+                fingerprints.pop(trigger_id, None)
+            else:
+                jobs[trigger_id] = job
+        return jobs
+
+    @classmethod
+    def _bulk_remove_jobs(cls, trigger_ids) -> int:
+        """批量移除调度任务，整批只进入一次 jobstore 临界区
+
+        调度器的 _jobstores_lock 为可重入锁，逐个调用公开的 remove_job
+        仍保留其对未启动调度器和事件通知的处理。
+
+        Returns:
+            实际移除的任务数量
+        """
+        scheduler = cls._scheduler
+        fingerprints = cls._trigger_fingerprints
+        removed = 0
+        with scheduler._jobstores_lock:
+            for trigger_id in trigger_ids:
+                fingerprints.pop(trigger_id, None)
+                try:
+                    scheduler.remove_job(f"trigger_{trigger_id}")
+                    removed += 1
+                except JobLookupError:
+                    continue
+        return removed
+
     @classmethod
     def remove_job(cls, trigger_id: int):
         """移除调度任务
@@ -309,6 +786,7 @@ class SchedulerService:
             return
         
         job_id = f"trigger_{trigger_id}"
+        cls._trigger_fingerprints.pop(trigger_id, None)
         if cls._scheduler.get_job(job_id):
             cls._scheduler.remove_job(job_id)
             logger.info(f"移除调度任务: {job_id}")
@@ -326,6 +804,7 @@ class SchedulerService:
         job_id = f"trigger_{trigger_id}"
         if cls._scheduler.get_job(job_id):
             cls._scheduler.pause_job(job_id)
+            cls._set_fingerprint_enabled(trigger_id, False)
             logger.info(f"暂停调度任务: {job_id}")
     
     @classmethod
@@ -341,167 +820,232 @@ class SchedulerService:
         job_id = f"trigger_{trigger_id}"
         if cls._scheduler.get_job(job_id):
             cls._scheduler.resume_job(job_id)
+            cls._set_fingerprint_enabled(trigger_id, True)
             logger.info(f"恢复调度任务: {job_id}")
+
+    @classmethod
+    def _set_fingerprint_enabled(cls, trigger_id: int, enabled: bool):
+        """更新触发器指纹中的启用状态"""
+        fingerprint = cls._trigger_fingerprints.get(trigger_id)
+        if fingerprint is not None:
+            cls._trigger_fingerprints[trigger_id] = (fingerprint[0], enabled)
     
     @classmethod
     def load_triggers_from_db(cls):
-        """从数据库加载触发器"""
-        session = get_session()
+        """从数据库加载触发器
+
+        与 scheduler 中现有的 trigger 任务对比，只移除已不存在或已禁用的任务；
+        仅 cron 变化的任务原地改期，其他配置变化的任务才重新添加。
+        已有重载进行中时，等待该次重载完成而不再重复加载。
+        """
+        with cls._reload_lock:
+            inflight = cls._reload_inflight
+            if inflight is None:
+                inflight = cls._reload_inflight = futures.Future()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            inflight.result()
+            return
+
         try:
-            triggers = session.query(Trigger).filter(
-                Trigger.enabled == 1
+            cls._load_triggers_from_db()
+            inflight.set_result(None)
+        except Exception as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            with cls._reload_lock:
+                cls._reload_inflight = None
+
+    @classmethod
+    def _load_triggers_from_db(cls):
+        """从数据库加载触发器并与现有任务对比更新
+
+        加载成功后记录触发器表的水位，启动后第一次 sync_triggers_from_db 在表未变化时直接跳过。
+        """
+        failed = False
+        with session_scope() as session:
+            # 与读取触发器在同一事务中取得水位，两者对应同一份数据
+            watermark = _trigger_watermark(session)
+            # 只读取调度所需的列，不构建ORM对象
+            triggers = session.execute(
+                select(
+                    Trigger.id, Trigger.flow_id, Trigger.name, Trigger.cron_expression,
+                    Trigger.trigger_params, _MAX_INSTANCES, Trigger.enabled
+                ).where(Trigger.enabled == 1)
             ).all()
 
             logger.info(f"从数据库加载 {len(triggers)} 个启用的触发器")
 
-            # 先清理所有现有的trigger任务
-            existing_jobs = cls._scheduler.get_jobs()
-            for job in existing_jobs:
-                if job.id.startswith('trigger_'):
-                    logger.info(f"清理现有任务: {job.id}")
-                    cls._scheduler.remove_job(job.id)
+            existing_jobs = cls._get_managed_trigger_jobs()
+
+            # 清理数据库中已不存在或已禁用的trigger任务
+            stale_trigger_ids = existing_jobs.keys() - {trigger.id for trigger in triggers}
+            if stale_trigger_ids:
+                logger.info(f"清理现有任务: {sorted(stale_trigger_ids)}")
+                cls._bulk_remove_jobs(stale_trigger_ids)
 
-            # 重新加载所有启用的触发器
+            # 加载新增或配置变化的触发器
+            trigger_cache.clear()
+            fingerprints = cls._trigger_fingerprints
+            unchanged = 0
             for trigger in triggers:
+                snapshot = TriggerSnapshot.from_trigger(trigger)
+                trigger_cache.set(trigger.id, snapshot)
                 try:
-                    # 获取 max_instances，默认为 1（兼容旧数据）
-                    max_instances = getattr(trigger, 'max_instances', 1) or 1
-                    cls.add_job(
-                        trigger.id,
-                        trigger.flow_id,
-                        trigger.cron_expression,
-                        max_instances=max_instances
+                    fingerprint = _trigger_fingerprint(
+                        trigger.cron_expression, trigger.flow_id, trigger.max_instances,
+                        snapshot.name, snapshot.trigger_params
                     )
+                    current = fingerprints.get(trigger.id) if trigger.id in existing_jobs else None
+                    if current is not None and current[0] == fingerprint:
+                        if not current[1]:
+                            cls.resume_job(trigger.id)
+                        unchanged += 1
+                        continue
+                    if current is not None:
+                        cls._update_trigger_job(trigger, current, fingerprint)
+                        continue
+                    cls.add_trigger_job(trigger)
                 except Exception as e:
+                    failed = True
                     logger.error(f"加载触发器失败 {trigger.id}: {e}")
-        finally:
-            session.close()
+            if unchanged:
+                logger.info(f"{unchanged} 个触发器任务未变化，保留现有调度")
+        # 有失败时不记录水位，交由下次同步重新完整对比
+        cls._sync_watermark = None if failed else watermark
 
     @classmethod
     def sync_triggers_from_db(cls):
         """智能同步数据库触发器到 scheduler
 
-        对比数据库中的触发器配置与 scheduler 中实际的 job，只更新不一致的部分。
+        对比数据库中的触发器配置与内存中记录的任务指纹，只更新不一致的部分。
         这解决了前端修改触发器后 scheduler 未及时更新的问题。
-        优化：减少临时对象创建，使用更高效的查询方式。
         """
         if cls._scheduler is None:
             logger.warning("调度器未初始化，跳过同步")
             return
 
-        session = get_session()
         try:
-            sync_result = {
-                'added': 0,
-                'updated': 0,
-                'removed': 0,
-                'paused': 0,
-                'resumed': 0,
-                'unchanged': 0
-            }
-
-            # 获取 scheduler 中所有的 trigger 任务 ID（使用字典存储 job 信息，避免重复查询）
-            scheduler_jobs_info = {}
-            for job in cls._scheduler.get_jobs():
-                if job.id.startswith('trigger_'):
-                    try:
-                        trigger_id = int(job.id.split('_')[1])
-                        scheduler_jobs_info[trigger_id] = {
-                            'job': job,
-                            'paused': job.next_run_time is None,
-                            'max_instances': getattr(job, 'max_instances', 1)
-                        }
-                    except (ValueError, IndexError):
-                        continue
+            with session_scope() as session:
+                sync_result = {
+                    'added': 0,
+                    'updated': 0,
+                    'removed': 0,
+                    'paused': 0,
+                    'resumed': 0,
+                    'unchanged': 0
+                }
 
-            db_trigger_ids = set()
+                # 先与调度器中的任务快照对齐，被移除的任务会重新添加
+                managed_count = len(cls._trigger_fingerprints)
+                cls._get_managed_trigger_jobs()
+
+                # 触发器表的修改时间和数量均未变化，且没有任务丢失时，跳过完整对比
+                watermark = _trigger_watermark(session)
+                if watermark == cls._sync_watermark and managed_count == len(cls._trigger_fingerprints):
+                    sync_result['unchanged'] = watermark[1]
+                    logger.debug("触发器未变化，跳过同步")
+                    return sync_result
+
+                # 触发器表有变化，可能来自其他进程，清空详情缓存使页面读取到最新配置
+                trigger_detail_cache.clear()
+
+                # 循环中频繁访问的类属性绑定为局部变量
+                fingerprints = cls._trigger_fingerprints
+                db_trigger_ids = set()
+                failed = False
+
+                # 只读取对比所需的列并分批流式读取，与内存中的任务指纹比较，只处理发生变化的触发器
+                rows = session.execute(
+                    select(
+                        Trigger.id, Trigger.flow_id, Trigger.name, Trigger.cron_expression,
+                        Trigger.trigger_params, _MAX_INSTANCES, Trigger.enabled
+                    ).execution_options(yield_per=500)
+                )
+                # 对比阶段只收集需要执行的操作，之后在一次 jobstore 临界区内统一执行
+                operations = []
+                for trigger in rows:
+                    db_trigger_ids.add(trigger.id)
+                    # 顺带刷新快照，其他进程修改的触发器最迟一个同步周期后生效
+                    snapshot = TriggerSnapshot.from_trigger(trigger)
+                    trigger_cache.set(trigger.id, snapshot)
+                    current = fingerprints.get(trigger.id)
+
+                    if trigger.enabled:
+                        fingerprint = _trigger_fingerprint(
+                            trigger.cron_expression, trigger.flow_id, trigger.max_instances,
+                            snapshot.name, snapshot.trigger_params
+                        )
+                        if current is None:
+                            operations.append(('added', trigger, current, fingerprint))
+                        elif current[0] != fingerprint:
+                            operations.append(('updated', trigger, current, fingerprint))
+                        elif not current[1]:
+                            # 任务被暂停，恢复
+                            operations.append(('resumed', trigger, current, fingerprint))
+                        else:
+                            sync_result['unchanged'] += 1
+                    elif current is not None and current[1]:
+                        # 触发器已禁用
+                        operations.append(('paused', trigger, current, None))
+                    else:
+                        sync_result['unchanged'] += 1
 
-            # 使用迭代器逐条处理触发器，避免一次性加载所有数据
-            for trigger in session.query(Trigger).yield_per(50):
-                db_trigger_ids.add(trigger.id)
-                job_info = scheduler_jobs_info.get(trigger.id)
-                max_instances = getattr(trigger, 'max_instances', 1) or 1
+                orphaned_job_ids = set(fingerprints) - db_trigger_ids
+                for trigger_id in orphaned_job_ids:
+                    trigger_cache.pop(trigger_id)
 
-                if trigger.enabled:
-                    if job_info is None:
-                        # 任务不存在，需要添加
+                # jobstore 锁为可重入锁，整批操作只获取一次，期间调度线程不会读到改了一半的任务
+                with cls._scheduler._jobstores_lock:
+                    for action, trigger, current, fingerprint in operations:
                         try:
-                            cls.add_job(trigger.id, trigger.flow_id, trigger.cron_expression, max_instances=max_instances)
-                            sync_result['added'] += 1
-                            logger.info(f"同步添加触发器: {trigger.id} ({trigger.name})")
+                            if action == 'added':
+                                cls.add_trigger_job(trigger)
+                            elif action == 'updated':
+                                cls._update_trigger_job(trigger, current, fingerprint)
+                            elif action == 'resumed':
+                                cls.resume_job(trigger.id)
+                            else:
+                                cls.pause_job(trigger.id)
+                            sync_result[action] += 1
+                            logger.info(f"同步{_SYNC_ACTION_NAMES[action]}触发器: {trigger.id} ({trigger.name})")
                         except Exception as e:
-                            logger.error(f"同步添加触发器失败 {trigger.id}: {e}")
-                    else:
-                        job = job_info['job']
-                        need_update = False
-
-                        # 检查 cron 表达式是否变化
-                        if hasattr(job.trigger, 'fields'):
-                            field_values = [str(field) for field in job.trigger.fields[:5]]
-                            reconstructed_cron = ' '.join(field_values)
-                            if reconstructed_cron != trigger.cron_expression:
-                                need_update = True
-
-                        # 检查 max_instances 是否变化
-                        if not need_update and job_info['max_instances'] != max_instances:
-                            need_update = True
-
-                        # 检查任务是否被暂停
-                        if not need_update and job_info['paused']:
-                            cls.resume_job(trigger.id)
-                            sync_result['resumed'] += 1
-                            logger.info(f"同步恢复触发器: {trigger.id} ({trigger.name})")
-
-                        if need_update:
-                            try:
-                                cls.add_job(trigger.id, trigger.flow_id, trigger.cron_expression, max_instances=max_instances)
-                                sync_result['updated'] += 1
-                                logger.info(f"同步更新触发器: {trigger.id} ({trigger.name})")
-                            except Exception as e:
-                                logger.error(f"同步更新触发器失败 {trigger.id}: {e}")
-                        else:
-                            sync_result['unchanged'] += 1
-                else:
-                    # 触发器已禁用
-                    if job_info is not None:
+                            failed = True
+                            logger.error(f"同步{_SYNC_ACTION_NAMES[action]}触发器失败 {trigger.id}: {e}")
+
+                    # 移除 scheduler 中存在但数据库中不存在的任务
+                    if orphaned_job_ids:
                         try:
-                            cls.pause_job(trigger.id)
-                            sync_result['paused'] += 1
-                            logger.info(f"同步暂停触发器: {trigger.id} ({trigger.name})")
+                            sync_result['removed'] += cls._bulk_remove_jobs(orphaned_job_ids)
+                            logger.info(f"同步移除孤儿触发器任务: {sorted(orphaned_job_ids)}")
                         except Exception as e:
-                            logger.error(f"同步暂停触发器失败 {trigger.id}: {e}")
-                    else:
-                        sync_result['unchanged'] += 1
-
-            # 移除 scheduler 中存在但数据库中不存在的任务
-            orphaned_job_ids = set(scheduler_jobs_info.keys()) - db_trigger_ids
-            for trigger_id in orphaned_job_ids:
-                try:
-                    cls.remove_job(trigger_id)
-                    sync_result['removed'] += 1
-                    logger.info(f"同步移除孤儿触发器任务: trigger_{trigger_id}")
-                except Exception as e:
-                    logger.error(f"同步移除孤儿触发器失败 {trigger_id}: {e}")
-
-            # 记录同步结果
-            total_actions = sum(v for k, v in sync_result.items() if k != 'unchanged')
-            if total_actions > 0:
-                logger.info(
-                    f"触发器同步完成: 添加={sync_result['added']}, "
-                    f"更新={sync_result['updated']}, 暂停={sync_result['paused']}, "
-                    f"恢复={sync_result['resumed']}, 移除={sync_result['removed']}, "
-                    f"未变={sync_result['unchanged']}"
-                )
-            else:
-                logger.debug("触发器同步完成，无需更改")
+                            failed = True
+                            logger.error(f"同步移除孤儿触发器失败 {sorted(orphaned_job_ids)}: {e}")
+
+                # 有失败时不记录水位，下次同步重新完整对比
+                cls._sync_watermark = None if failed else watermark
+
+                # 记录同步结果
+                total_actions = sum(v for k, v in sync_result.items() if k != 'unchanged')
+                if total_actions > 0:
+                    logger.info(
+                        f"触发器同步完成: 添加={sync_result['added']}, "
+                        f"更新={sync_result['updated']}, 暂停={sync_result['paused']}, "
+                        f"恢复={sync_result['resumed']}, 移除={sync_result['removed']}, "
+                        f"未变={sync_result['unchanged']}"
+                    )
+                else:
+                    logger.debug("触发器同步完成，无需更改")
 
-            return sync_result
+                return sync_result
 
         except Exception as e:
             logger.error(f"同步触发器时发生错误: {e}")
             return None
-        finally:
-            session.close()
     
     @classmethod
     def add_immediate_job(cls, flow_id: str, input_data: Optional[Dict[str, Any]] = None,
@@ -523,47 +1067,154 @@ class SchedulerService:
                 cls.start_scheduler()
 
         if job_id is None:
-            job_id = f"immediate_{flow_id}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+            job_id = cls._next_immediate_job_id(flow_id)
 
-        # 先创建FlowHistory记录
-        session = get_session()
-        flow_history = None
+        # 先创建FlowHistory记录，由写入线程与并发请求合并为一次 INSERT ... RETURNING
+        now = datetime.now()
+        future = _history_writer.submit({
+            'flow_id': flow_id,
+            'status': 'pending',
+            'input_data': json.dumpb(input_data) if input_data else _EMPTY_JSON,
+            'created_at': now
+        })
         try:
-            flow_history = FlowHistory(
-                flow_id=flow_id,
-                status='pending',
-                input_data=json.dumps(input_data or {}),
-                created_at=datetime.now()
-            )
-            session.add(flow_history)
-            session.commit()
-            flow_history_id = flow_history.id
+            try:
+                flow_history_id = future.result(timeout=_HISTORY_WRITE_TIMEOUT)
+            except futures.TimeoutError:
+                # 尚未开始写入时取消，不会留下无人执行的 pending 记录；
+                # 已在写入中则等待写入完成，记录照常调度执行
+                if future.cancel():
+                    raise
+                flow_history_id = future.result()
             logger.info(f"创建FlowHistory记录: {flow_history_id}")
         except Exception as e:
-            session.rollback()
             logger.error(f"创建FlowHistory失败: {e}")
             raise
-        finally:
-            session.close()
 
-        run_date = datetime.now() + timedelta(seconds=delay_seconds)
-        trigger = DateTrigger(run_date=run_date)
-
-        cls._scheduler.add_job(
-            func=cls.execute_immediate_flow,
-            trigger=trigger,
-            id=job_id,
-            args=[flow_id, input_data, flow_history_id],
-            replace_existing=False
-        )
-
-        logger.info(f"添加即时任务: {job_id}, 流程: {flow_id}, 历史记录ID: {flow_history_id}, 执行时间: {run_date}")
+        cls._schedule_immediate_job(job_id, flow_id, input_data, flow_history_id, delay_seconds, now)
 
         return {
             'job_id': job_id,
             'flow_history_id': flow_history_id
         }
 
+    @classmethod
+    def add_immediate_jobs_bulk(cls, items: List[Dict[str, Any]], delay_seconds: int = 1) -> List[dict]:
+        """批量添加即时任务
+
+        所有FlowHistory记录在一次 executemany INSERT 中创建。
+
+        Args:
+            items: 任务列表，每项包含 flow_id，可选 input_data、job_id
+            delay_seconds: 延迟执行秒数，默认1秒
+
+        Returns:
+            与 items 顺序一致的任务ID和历史记录ID字典列表
+        """
+        if not items:
+            return []
+
+        if cls._scheduler is None:
+            cls.init_scheduler()
+            if not cls._scheduler_started:
+                cls.start_scheduler()
+
+        now = datetime.now()
+        rows = [
+            {
+                'flow_id': item['flow_id'],
+                'status': 'pending',
+                'input_data': json.dumpb(item['input_data']) if item.get('input_data') else _EMPTY_JSON,
+                'created_at': now
+            }
+            for item in items
+        ]
+
+        try:
+            with session_scope() as session:
+                stmt = insert(FlowHistory).returning(FlowHistory.id, sort_by_parameter_order=True)
+                flow_history_ids = session.scalars(stmt, rows).all()
+            logger.info(f"批量创建FlowHistory记录: {len(flow_history_ids)} 条")
+        except Exception as e:
+            logger.error(f"批量创建FlowHistory失败: {e}")
+            raise
+
+        results = []
+        for item, flow_history_id in zip(items, flow_history_ids):
+            flow_id = item['flow_id']
+            job_id = item.get('job_id') or cls._next_immediate_job_id(flow_id)
+            cls._schedule_immediate_job(job_id, flow_id, item.get('input_data'), flow_history_id, delay_seconds, now)
+            results.append({
+                'job_id': job_id,
+                'flow_history_id': flow_history_id
+            })
+        return results
+
+    @classmethod
+    def _next_immediate_job_id(cls, flow_id: str) -> str:
+        """生成即时任务ID：进程内自增序号保证唯一，不依赖时间格式化"""
+        return f"immediate_{flow_id}_{next(cls._immediate_id_counter):x}_{time.monotonic_ns():x}"
+
+    @classmethod
+    def _schedule_immediate_job(cls, job_id: str, flow_id: str, input_data: Optional[Dict[str, Any]],
+                                flow_history_id: int, delay_seconds: int, now: Optional[datetime] = None):
+        """执行已创建历史记录的即时任务
+
+        延迟不超过1秒时直接提交到线程池立即执行，省去调度器的轮询延迟；
+        否则以 DateTrigger 加入调度器，执行时间从 now（历史记录的创建时间）起算。
+        """
+        if delay_seconds <= 1:
+            with cls._immediate_lock:
+                cls._immediate_inflight[job_id] = flow_history_id
+            cls._get_immediate_pool().submit(cls._run_immediate_flow, job_id, flow_id, input_data, flow_history_id)
+            logger.info(f"提交即时任务: {job_id}, 流程: {flow_id}, 历史记录ID: {flow_history_id}")
+            return
+
+        run_date = (now or datetime.now()) + timedelta(seconds=delay_seconds)
+        with cls._immediate_lock:
+            cls._scheduled_immediate_jobs[job_id] = flow_history_id
+        try:
+            cls._scheduler.add_job(
+                func=cls.execute_immediate_flow,
+                trigger=DateTrigger(run_date=run_date),
+                id=job_id,
+                args=[flow_id, input_data, flow_history_id],
+                replace_existing=False
+            )
+        except Exception:
+            with cls._immediate_lock:
+                cls._scheduled_immediate_jobs.pop(job_id, None)
+            raise
+
+        logger.info(f"添加即时任务: {job_id}, 流程: {flow_id}, 历史记录ID: {flow_history_id}, 执行时间: {run_date}")
+
+    @classmethod
+    def _on_job_removed(cls, event):
+        """调度器移除任务时清除即时任务登记"""
+        with cls._immediate_lock:
+            cls._scheduled_immediate_jobs.pop(event.job_id, None)
+
+    @classmethod
+    def _get_immediate_pool(cls) -> futures.ThreadPoolExecutor:
+        """获取即时任务线程池（延迟初始化），大小由 immediate_max_workers 配置"""
+        with cls._immediate_lock:
+            if cls._immediate_pool is None:
+                cls._immediate_pool = futures.ThreadPoolExecutor(
+                    max_workers=get_config().immediate_max_workers,
+                    thread_name_prefix='flowy-immediate'
+                )
+            return cls._immediate_pool
+
+    @classmethod
+    def _run_immediate_flow(cls, job_id: str, flow_id: str, input_data: Optional[Dict[str, Any]],
+                            flow_history_id: int):
+        """线程池中执行即时任务，结束后移出执行中登记"""
+        try:
+            cls.execute_immediate_flow(flow_id, input_data, flow_history_id)
+        finally:
+            with cls._immediate_lock:
+                cls._immediate_inflight.pop(job_id, None)
+
     @classmethod
     def execute_immediate_flow(cls, flow_id: str, input_data: Optional[Dict[str, Any]] = None, flow_history_id: Optional[int] = None):
         """执行即时工作流
@@ -592,55 +1243,94 @@ class SchedulerService:
             )
             logger.info(f"工作流执行完成: {flow_id}, 结果: {result}")
 
-            # 更新历史记录状态为完成
+            # 更新历史记录状态为完成，并写入输出数据
             if flow_history_id and result.get('success'):
-                cls.update_flow_history_status(flow_history_id, 'completed', None)
-                # 更新输出数据
-                session = get_session()
-                try:
-                    history = session.query(FlowHistory).filter(FlowHistory.id == flow_history_id).first()
-                    if history:
-                        history.output_data = json.dumps(result)
-                        session.commit()
-                except Exception as e:
-                    session.rollback()
-                    logger.error(f"更新输出数据失败: {e}")
-                finally:
-                    session.close()
+                cls._finalize_history(flow_history_id, 'completed', output=result, flow_id=flow_id)
         except Exception as e:
             logger.error(f"执行即时任务失败 {flow_id}: {e}")
             # 更新历史记录状态为失败
             if flow_history_id:
-                cls.update_flow_history_status(flow_history_id, 'failed', str(e))
+                cls._finalize_history(flow_history_id, 'failed', error=str(e), flow_id=flow_id)
+
+    @classmethod
+    def _finalize_history(cls, flow_history_id: int, status: str, output: Optional[Dict[str, Any]] = None,
+                          error: Optional[str] = None, flow_id: Optional[str] = None,
+                          end_time: Optional[datetime] = None):
+        """以单条 UPDATE 写入结束状态、结束时间和输出数据
+
+        执行时长在 SQL 中由 start_time 计算，无需先查询记录。
+
+        Args:
+            flow_history_id: 历史记录ID
+            status: 结束状态（completed / failed）
+            output: 输出数据（可选）
+            error: 错误信息（可选），没有 output 时以 {'error': ...} 写入 output_data
+            flow_id: 工作流ID，用于使统计缓存失效，为 None 时清空所有Flow的缓存
+            end_time: 结束时间（可选），默认为当前时间
+        """
+        end_time = end_time or datetime.now()
+        values = {
+            'status': status,
+            'end_time': end_time,
+            'duration_seconds': _elapsed_seconds(FlowHistory.start_time, end_time)
+        }
+        if output is not None:
+            values['output_data'] = json.dumpb(output)
+        elif error:
+            # 将错误信息存储在output_data中
+            values['output_data'] = _error_output(error)
+
+        try:
+            with session_scope() as session:
+                session.execute(
+                    update(FlowHistory)
+                    .where(FlowHistory.id == flow_history_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            invalidate_flow_caches(flow_id, refresh_stats=False)
+            logger.info(f"更新FlowHistory {flow_history_id} 状态为: {status}")
+        except Exception as e:
+            logger.error(f"更新FlowHistory状态失败: {e}")
 
     @classmethod
-    def update_flow_history_status(cls, flow_history_id: int, status: str, error_msg: Optional[str] = None):
+    def update_flow_history_status(cls, flow_history_id: int, status: str, error_msg: Optional[str] = None,
+                                   now: Optional[datetime] = None):
         """更新FlowHistory状态
 
+        以单条 UPDATE 完成，不预先查询记录；结束状态（completed / failed）交由
+        _finalize_history 处理。
+
         Args:
             flow_history_id: 历史记录ID
             status: 新状态
             error_msg: 错误信息（可选）
+            now: 状态变更时间（可选），调用方已取得当前时间时传入，默认为当前时间
         """
-        session = get_session()
+        if status in ['completed', 'failed']:
+            cls._finalize_history(flow_history_id, status, error=error_msg, end_time=now)
+            return
+
+        values = {'status': status}
+        if status == 'running':
+            start_time = now or datetime.now()
+            values['start_time'] = start_time
+            values['wait_seconds'] = _elapsed_seconds(FlowHistory.created_at, start_time)
+
         try:
-            flow_history = session.query(FlowHistory).filter(FlowHistory.id == flow_history_id).first()
-            if flow_history:
-                flow_history.status = status
-                if status == 'running':
-                    flow_history.start_time = datetime.now()
-                elif status in ['completed', 'failed']:
-                    flow_history.end_time = datetime.now()
-                    if error_msg:
-                        # 将错误信息存储在output_data中
-                        flow_history.output_data = json.dumps({'error': error_msg})
-                session.commit()
+            with session_scope() as session:
+                updated = session.execute(
+                    update(FlowHistory)
+                    .where(FlowHistory.id == flow_history_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+            if updated:
                 logger.info(f"更新FlowHistory {flow_history_id} 状态为: {status}")
+            else:
+                logger.warning(f"FlowHistory {flow_history_id} 不存在，未更新状态")
         except Exception as e:
-            session.rollback()
             logger.error(f"更新FlowHistory状态失败: {e}")
-        finally:
-            session.close()
 
     @classmethod
     def get_job_status(cls, job_id: str) -> Optional[Dict[str, Any]]:
@@ -664,52 +1354,102 @@ class SchedulerService:
                 'trigger': str(job.trigger),
                 'pending': job.pending
             }
+
+        # 直接提交到线程池的即时任务不在调度器中，由执行中登记查询
+        with cls._immediate_lock:
+            flow_history_id = cls._immediate_inflight.get(job_id)
+        if flow_history_id is not None:
+            return {
+                'id': job_id,
+                'name': cls.execute_immediate_flow.__qualname__,
+                'next_run_time': None,
+                'trigger': 'immediate',
+                'pending': False,
+                'flow_history_id': flow_history_id
+            }
         return None
 
     @classmethod
-    def execute_trigger(cls, trigger_id: int):
-        """执行触发器
+    def invalidate_trigger(cls, trigger_id: int):
+        """使触发器快照失效，触发器被修改、删除或切换状态后调用
 
         Args:
             trigger_id: 触发器ID
         """
-        session = get_session()
-        try:
-            trigger = session.query(Trigger).filter(
-                Trigger.id == trigger_id
+        trigger_cache.pop(trigger_id)
+
+    @classmethod
+    def _get_trigger_snapshot(cls, trigger_id: int) -> Optional[TriggerSnapshot]:
+        """获取触发器快照，缓存未命中时从数据库读取"""
+        snapshot = trigger_cache.get(trigger_id)
+        if snapshot is not None:
+            return snapshot
+        return cls._load_trigger_bundle(trigger_id)
+
+    @classmethod
+    def _load_trigger_bundle(cls, trigger_id: int) -> Optional[TriggerSnapshot]:
+        """以单条查询读取执行触发器所需的全部字段，并写入快照缓存
+
+        今后如需校验关联表，应在此查询中 JOIN，保持一次往返。
+        """
+        with session_scope() as session:
+            row = session.execute(
+                select(
+                    Trigger.id, Trigger.flow_id, Trigger.name, Trigger.enabled, Trigger.trigger_params
+                ).where(Trigger.id == trigger_id)
             ).first()
+        if row is None:
+            return None
+
+        snapshot = TriggerSnapshot.from_trigger(row)
+        trigger_cache.set(trigger_id, snapshot)
+        return snapshot
+
+    @classmethod
+    def execute_trigger(cls, trigger_id: int, flow_id: Optional[str] = None,
+                        metadata: Optional[Dict[str, Any]] = None,
+                        trigger_params: Optional[Dict[str, Any]] = None):
+        """执行触发器
 
-            if not trigger or not trigger.enabled:
+        每次触发先按主键查询触发器的启用状态，在其他进程中被停用或删除的触发器不再执行。
+        任务参数中带有 flow_id 时直接使用预先构建的元数据和参数执行；
+        否则从进程内快照读取触发器配置，快照未命中时才查询数据库。
+        其他进程修改的触发参数与 cron 表达式由触发器同步任务应用，
+        最迟在 _MAX_POLL_INTERVAL 秒后生效，期间仍按修改前的配置执行。
+
+        Args:
+            trigger_id: 触发器ID
+            flow_id: 工作流ID（可选）
+            metadata: 预先构建的执行元数据（可选）
+            trigger_params: 已解析的触发参数（可选）
+        """
+        try:
+            with session_scope() as session:
+                enabled = session.scalar(select(Trigger.enabled).where(Trigger.id == trigger_id))
+            if not enabled:
                 logger.warning(f"触发器 {trigger_id} 不存在或未启用")
                 return
 
-            # 解析触发参数
-            trigger_params = {}
-            if trigger.trigger_params:
-                try:
-                    trigger_params = json.loads(trigger.trigger_params)
-                except Exception as e:
-                    logger.error(f"解析触发参数失败 {trigger_id}: {e}")
+            if flow_id is None:
+                trigger = cls._get_trigger_snapshot(trigger_id)
 
-            # 构建元数据
-            metadata = {
-                'trigger_id': trigger_id,
-                'trigger_name': trigger.name,
-                'trigger_type': 'scheduled'
-            }
+                if not trigger or not trigger.enabled:
+                    logger.warning(f"触发器 {trigger_id} 不存在或未启用")
+                    return
 
-            logger.info(f"执行触发器 {trigger_id}: {trigger.name}")
+                flow_id, trigger_params = trigger.flow_id, trigger.trigger_params
+                metadata = _trigger_metadata(trigger_id, trigger.name)
 
-            # 执行工作流
+            logger.info(f"执行触发器 {trigger_id}: {metadata['trigger_name']}")
+
+            # 执行工作流，execute_flow 会修改 input_data，传入副本以免污染共享的参数
             execute_flow(
-                flow_id=trigger.flow_id,
-                input_data=trigger_params,
+                flow_id=flow_id,
+                input_data=dict(trigger_params or {}),
                 metadata=metadata
             )
         except Exception as e:
             logger.error(f"执行触发器失败 {trigger_id}: {e}")
-        finally:
-            session.close()
 
     @classmethod
     def check_orphaned_jobs(cls, pending_timeout_minutes: int = 5, running_timeout_hours: int = 24,
@@ -717,12 +1457,12 @@ class SchedulerService:
         """检查孤儿任务（状态为 pending 或 running 但实际已丢失的任务）
 
         当 scheduler 重启时，等待中的即时任务会丢失。此方法定期检查并将这些任务标记为失败。
-        使用分页查询避免一次性加载大量数据到内存。
+        所有判断均在 SQL 中完成，以几条 UPDATE 处理全部记录，不加载数据到内存。
 
         Args:
             pending_timeout_minutes: pending 状态超时时间（分钟），超过此时间仍在 pending 则认为丢失
             running_timeout_hours: running 状态超时时间（小时），超过此时间仍在 running 则认为可能卡死
-            batch_size: 每批处理的记录数量，默认100
+            batch_size: 已不再使用，保留以兼容旧的调用方式
         """
         now = datetime.now()
         pending_timeout = timedelta(minutes=pending_timeout_minutes)
@@ -734,135 +1474,102 @@ class SchedulerService:
             'task_count': 0
         }
 
-        # 获取 scheduler 中所有即时任务的 job_id 前缀（一次性获取，避免重复查询）
-        immediate_job_prefixes = set()
-        if cls._scheduler:
-            for job in cls._scheduler.get_jobs():
-                if job.id.startswith('immediate_') and job.next_run_time and job.next_run_time > now:
-                    # 提取 flow_id 部分: immediate_{flow_id}_{timestamp}
-                    parts = job.id.split('_')
-                    if len(parts) >= 2:
-                        immediate_job_prefixes.add(f"immediate_{parts[1]}_")
-
-        # 1. 分页处理 pending 状态超时的 FlowHistory
-        session = get_session()
-        try:
-            offset = 0
-            while True:
-                pending_batch = session.query(FlowHistory).filter(
-                    FlowHistory.status == 'pending',
-                    FlowHistory.created_at < (now - pending_timeout)
-                ).limit(batch_size).offset(offset).all()
-
-                if not pending_batch:
-                    break
-
-                for history in pending_batch:
-                    # 检查是否有对应的即时任务
-                    task_lost = True
-                    prefix = f"immediate_{history.flow_id}_"
-                    if prefix in immediate_job_prefixes:
-                        task_lost = False
-
-                    if task_lost:
-                        logger.warning(f"FlowHistory {history.id} (flow={history.flow_id}) 任务丢失，标记为失败")
-                        history.status = 'failed'
-                        history.end_time = now
-                        history.output_data = json.dumps({
-                            'error': '任务丢失：调度器重启或任务超时',
-                            'original_status': 'pending',
-                            'detected_at': now.isoformat()
-                        })
-
-                        # 更新关联的 running 状态的 TaskHistory
-                        session.query(TaskHistory).filter(
-                            TaskHistory.flow_history_id == history.id,
-                            TaskHistory.status == 'running'
-                        ).update({'status': 'failed', 'end_time': now}, synchronize_session=False)
-
-                        result['pending_count'] += 1
-
-                session.commit()
-                offset += batch_size
+        # 等待调度器执行及已提交到线程池的即时任务对应的 FlowHistory ID，均由本地登记表取得；
+        # 按记录ID精确排除，同一 Flow 的其他丢失记录不会因该 Flow 仍有待执行任务而被跳过
+        with cls._immediate_lock:
+            live_history_ids = set(cls._scheduled_immediate_jobs.values())
+            live_history_ids.update(cls._immediate_inflight.values())
 
-        except Exception as e:
-            session.rollback()
-            logger.error(f"处理 pending 孤儿任务时发生错误: {e}")
-        finally:
-            session.close()
+        # 同一次检查中的所有记录共用一份错误信息
+        detected_at = now.isoformat()
+        lost_output = _error_output(
+            '任务丢失：调度器重启或任务超时', original_status='pending', detected_at=detected_at
+        )
+        stale_output = _error_output(
+            f'任务运行超时（超过 {running_timeout_hours} 小时）且无活动任务',
+            original_status='running', detected_at=detected_at
+        )
 
-        # 2. 分页处理 running 状态超时的 FlowHistory
-        session = get_session()
+        # 超时的 pending 记录中，没有对应即时任务的视为丢失；排除条件以小列表下推到 SQL
+        lost_filter = [FlowHistory.status == 'pending', FlowHistory.created_at < (now - pending_timeout)]
+        if live_history_ids:
+            lost_filter.append(FlowHistory.id.not_in(live_history_ids))
+
+        # 超时的 running 记录中，已没有运行中任务的视为卡死
+        stale_filter = [
+            FlowHistory.status == 'running',
+            FlowHistory.start_time < (now - running_timeout),
+            ~select(TaskHistory.id).where(
+                TaskHistory.flow_history_id == FlowHistory.id, TaskHistory.status == 'running'
+            ).exists()
+        ]
+
+        # 判断条件均可由单行数据得出，全部以服务端 UPDATE 完成，不把记录读回 Python；
+        # 所有修改在同一事务中完成，每次检查只提交一次
         try:
-            offset = 0
-            while True:
-                running_batch = session.query(FlowHistory).filter(
-                    FlowHistory.status == 'running',
-                    FlowHistory.start_time < (now - running_timeout)
-                ).limit(batch_size).offset(offset).all()
-
-                if not running_batch:
-                    break
-
-                for history in running_batch:
-                    # 检查是否有 TaskHistory 仍在运行
-                    running_tasks_count = session.query(TaskHistory).filter(
-                        TaskHistory.flow_history_id == history.id,
-                        TaskHistory.status == 'running'
-                    ).count()
-
-                    if running_tasks_count == 0:
-                        logger.warning(f"FlowHistory {history.id} 无运行中任务但状态为 running，标记为失败")
-                        history.status = 'failed'
-                        history.end_time = now
-                        history.output_data = json.dumps({
-                            'error': f'任务运行超时（超过 {running_timeout_hours} 小时）且无活动任务',
-                            'original_status': 'running',
-                            'detected_at': now.isoformat()
-                        })
-                        result['running_count'] += 1
-
-                session.commit()
-                offset += batch_size
+            with session_scope() as session:
+                # 1. 丢失的 pending 记录：先更新其 running 状态的 TaskHistory，再标记 FlowHistory 为失败
+                session.execute(
+                    update(TaskHistory)
+                    .where(
+                        TaskHistory.status == 'running',
+                        TaskHistory.flow_history_id.in_(select(FlowHistory.id).where(*lost_filter))
+                    )
+                    .values(status='failed', end_time=now)
+                    .execution_options(synchronize_session=False)
+                )
+                result['pending_count'] = session.execute(
+                    update(FlowHistory)
+                    .where(*lost_filter)
+                    .values(status='failed', end_time=now, output_data=lost_output)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+
+                # 2. 卡死的 running 记录，执行时长在 SQL 中由 start_time 计算
+                result['running_count'] = session.execute(
+                    update(FlowHistory)
+                    .where(*stale_filter)
+                    .values(
+                        status='failed',
+                        end_time=now,
+                        duration_seconds=_elapsed_seconds(FlowHistory.start_time, now),
+                        output_data=stale_output
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+
+                # 3. 所属 Flow 已结束但仍为 running 的 TaskHistory，以一条 UPDATE 同步为 Flow 的结束状态和时间
+                flow_history = select(FlowHistory).where(
+                    FlowHistory.id == TaskHistory.flow_history_id
+                ).correlate(TaskHistory)
+                result['task_count'] = session.execute(
+                    update(TaskHistory)
+                    .where(
+                        TaskHistory.status == 'running',
+                        TaskHistory.start_time < (now - running_timeout),
+                        flow_history.where(FlowHistory.status.in_(('completed', 'failed'))).exists()
+                    )
+                    .values(
+                        status=flow_history.with_only_columns(FlowHistory.status).scalar_subquery(),
+                        end_time=flow_history.with_only_columns(FlowHistory.end_time).scalar_subquery()
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+            if result['pending_count']:
+                logger.warning(f"{result['pending_count']} 个 pending 状态的 FlowHistory 任务丢失，标记为失败")
+            if result['running_count']:
+                logger.warning(f"{result['running_count']} 个 FlowHistory 无运行中任务但状态为 running，标记为失败")
+            if result['task_count']:
+                logger.warning(f"{result['task_count']} 个 TaskHistory 的 Flow 已结束，标记任务状态")
 
         except Exception as e:
-            session.rollback()
-            logger.error(f"处理 running 孤儿任务时发生错误: {e}")
-        finally:
-            session.close()
+            # 所有修改在同一事务中回滚，下次检查时重新处理
+            result.update(pending_count=0, running_count=0, task_count=0)
+            logger.error(f"处理孤儿任务时发生错误: {e}")
 
-        # 3. 分页处理 TaskHistory 中的孤儿任务
-        session = get_session()
-        try:
-            offset = 0
-            while True:
-                orphaned_batch = session.query(TaskHistory).filter(
-                    TaskHistory.status == 'running',
-                    TaskHistory.start_time < (now - running_timeout)
-                ).limit(batch_size).offset(offset).all()
-
-                if not orphaned_batch:
-                    break
-
-                for task in orphaned_batch:
-                    flow_history = session.query(FlowHistory).filter(
-                        FlowHistory.id == task.flow_history_id
-                    ).first()
-
-                    if flow_history and flow_history.status in ['completed', 'failed']:
-                        logger.warning(f"TaskHistory {task.id} 的 Flow 已结束，标记任务状态")
-                        task.status = flow_history.status
-                        task.end_time = flow_history.end_time
-                        result['task_count'] += 1
-
-                session.commit()
-                offset += batch_size
-
-        except Exception as e:
-            session.rollback()
-            logger.error(f"处理 TaskHistory 孤儿任务时发生错误: {e}")
-        finally:
-            session.close()
+        if result['pending_count'] > 0 or result['running_count'] > 0:
+            running_gauge.decr(result['running_count'])
+            invalidate_flow_caches(refresh_stats=False)
 
         if result['pending_count'] > 0 or result['running_count'] > 0 or result['task_count'] > 0:
             logger.info(
@@ -3,17 +3,85 @@
 """触发器服务模块"""
 
 import logging
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 from flowy.core.json_utils import json
-from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import bindparam, delete, func, insert, literal, select, update
+from sqlalchemy.orm import load_only
 
-from flowy.core.db import get_session, Trigger, Flow
-from flowy.web.services.scheduler_service import SchedulerService
+from flowy.core.cache import trigger_detail_cache
+from flowy.core.db import session_scope, Trigger, Flow
+from flowy.web.services.scheduler_service import SchedulerService, _cron_trigger
 
 logger = logging.getLogger(__name__)
 
+# 按工作流查询触发器的语句在模块加载时构建，每次调用只绑定参数，直接命中语句编译缓存
+_TRIGGERS_BY_FLOW = select(Trigger).where(
+    Trigger.flow_id == bindparam('flow_id')
+).order_by(Trigger.created_at.desc())
+
+_TRIGGERS_VERSION = select(
+    func.count(Trigger.id),
+    func.max(Trigger.updated_at)
+).where(Trigger.flow_id == bindparam('flow_id'))
+
+
+def _validate_cron(cron_expression: str):
+    """校验Cron表达式
+
+    解析结果由 _cron_trigger 缓存，添加调度任务时直接复用，不会重复解析。
+
+    Raises:
+        ValueError: 当Cron表达式无效时
+    """
+    try:
+        _cron_trigger(cron_expression)
+    except Exception as e:
+        raise ValueError(f"无效的 Cron 表达式: {e}")
+
+
+def _detach(session, objs):
+    """将返回给调用方的对象移出会话
+
+    会话由 session_scope 管理，提交时会使会话内对象过期；移出后对象保留已加载的属性，
+    会话关闭后仍可读取。
+    """
+    for obj in objs:
+        session.expunge(obj)
+
+
+@dataclass(frozen=True, slots=True)
+class TriggerDetail:
+    """触发器详情的只读快照，字段与 Trigger 表一致，可在多个调用方之间安全共享"""
+    id: int
+    flow_id: str
+    name: str
+    description: Optional[str]
+    cron_expression: str
+    trigger_params: Optional[str]
+    max_instances: Optional[int]
+    enabled: int
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_trigger(cls, trigger: Trigger) -> 'TriggerDetail':
+        """由触发器对象构建快照"""
+        return cls(
+            id=trigger.id,
+            flow_id=trigger.flow_id,
+            name=trigger.name,
+            description=trigger.description,
+            cron_expression=trigger.cron_expression,
+            trigger_params=trigger.trigger_params,
+            max_instances=trigger.max_instances,
+            enabled=trigger.enabled,
+            created_at=trigger.created_at,
+            updated_at=trigger.updated_at
+        )
+
 
 class TriggerService:
     """触发器服务类"""
@@ -43,89 +111,122 @@ class TriggerService:
         Raises:
             ValueError: 当工作流不存在或Cron表达式无效时
         """
-        session = get_session()
-        try:
-            # 验证工作流存在
-            flow = session.query(Flow).filter(Flow.id == flow_id).first()
-            if not flow:
+        # 不依赖数据库的校验先于打开会话完成，无效请求不占用连接
+        # 验证 Cron 表达式
+        _validate_cron(cron_expression)
+
+        # 验证 max_instances
+        if max_instances < 1:
+            raise ValueError("max_instances 必须大于等于 1")
+
+        # 创建触发器，创建时间与更新时间取同一时刻
+        now = datetime.now()
+        values = {
+            'flow_id': flow_id,
+            'name': name,
+            'description': description,
+            'cron_expression': cron_expression,
+            'trigger_params': json.dumps(trigger_params, option=0),
+            'max_instances': max_instances,
+            'enabled': 1,
+            'created_at': now,
+            'updated_at': now
+        }
+
+        with session_scope() as session:
+            # 以 INSERT ... SELECT 在工作流存在时才插入，校验与插入一次往返完成；
+            # 没有返回ID说明工作流不存在
+            columns = Trigger.__table__.c
+            trigger_id = session.execute(
+                insert(Trigger)
+                .from_select(
+                    list(values),
+                    select(*(literal(value, columns[key].type) for key, value in values.items()))
+                    .where(Flow.id == flow_id)
+                )
+                .returning(Trigger.id)
+            ).scalar()
+            if trigger_id is None:
                 raise ValueError(f"工作流 {flow_id} 不存在")
+            # 所有字段均已知，直接构建对象返回，无需再查询
+            trigger = Trigger(id=trigger_id, **values)
 
-            # 验证 Cron 表达式
+            # 先添加到调度器再提交，调度失败时事务回滚，不留下没有调度任务的触发器
+            SchedulerService.add_trigger_job(trigger)
             try:
-                CronTrigger.from_crontab(cron_expression)
-            except Exception as e:
-                raise ValueError(f"无效的 Cron 表达式: {e}")
-
-            # 验证 max_instances
-            if max_instances < 1:
-                raise ValueError("max_instances 必须大于等于 1")
-
-            # 创建触发器
-            trigger = Trigger(
-                flow_id=flow_id,
-                name=name,
-                description=description,
-                cron_expression=cron_expression,
-                trigger_params=json.dumps(trigger_params, ensure_ascii=False),
-                max_instances=max_instances,
-                enabled=1,
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            )
-
-            session.add(trigger)
-            session.commit()
-            session.refresh(trigger)
-
-            # 添加到调度器
-            SchedulerService.add_job(
-                trigger.id,
-                trigger.flow_id,
-                trigger.cron_expression,
-                max_instances=max_instances
-            )
+                session.commit()
+            except Exception:
+                SchedulerService.remove_job(trigger.id)
+                raise
+            SchedulerService.notify_triggers_changed()
 
             logger.info(f"创建触发器成功: {trigger.id} - {trigger.name}, max_instances: {max_instances}")
             return trigger
-        finally:
-            session.close()
     
     @staticmethod
-    def get_triggers_by_flow(flow_id: str) -> List[Trigger]:
+    def get_triggers_by_flow(flow_id: str, columns: Optional[Sequence] = None,
+                             limit: Optional[int] = None, offset: int = 0) -> List[Trigger]:
         """获取指定工作流的触发器列表
         
         Args:
             flow_id: 工作流ID
+            columns: 只加载的列（可选），如 (Trigger.id, Trigger.name)，不需要 trigger_params 等大字段时使用；
+                未加载的属性在对象返回后不可访问
+            limit: 最多返回的条数（可选），为 None 时返回全部
+            offset: 跳过的条数，默认0
             
         Returns:
             触发器列表，按创建时间倒序排列
         """
-        session = get_session()
-        try:
-            from sqlalchemy import desc
-            return session.query(Trigger).filter(
-                Trigger.flow_id == flow_id
-            ).order_by(desc(Trigger.created_at)).all()
-        finally:
-            session.close()
+        with session_scope() as session:
+            stmt = _TRIGGERS_BY_FLOW
+            if columns:
+                stmt = stmt.options(load_only(*columns))
+            if offset:
+                stmt = stmt.offset(offset)
+            if limit is not None:
+                stmt = stmt.limit(limit)
+            triggers = session.scalars(stmt, {'flow_id': flow_id}).all()
+            _detach(session, triggers)
+            return triggers
     
     @staticmethod
-    def get_trigger_by_id(trigger_id: int) -> Optional[Trigger]:
+    def get_triggers_version(flow_id: str) -> str:
+        """获取指定工作流触发器列表的版本标识（用于ETag）
+
+        Args:
+            flow_id: 工作流ID
+
+        Returns:
+            由触发器数量和最近更新时间组成的版本标识
+        """
+        with session_scope() as session:
+            total, latest_updated = session.execute(_TRIGGERS_VERSION, {'flow_id': flow_id}).one()
+            return f'{total}:{latest_updated}'
+
+    @staticmethod
+    def get_trigger_by_id(trigger_id: int) -> Optional[TriggerDetail]:
         """根据ID获取触发器
         
         Args:
             trigger_id: 触发器ID
             
         Returns:
-            触发器对象，如果不存在则返回None
+            触发器详情快照，如果不存在则返回None；快照不可修改，缓存后由多个调用方共享
         """
-        session = get_session()
-        try:
-            return session.query(Trigger).filter(
-                Trigger.id == trigger_id
-            ).first()
-        finally:
-            session.close()
+        detail = trigger_detail_cache.get(trigger_id)
+        if detail is not None:
+            return detail
+
+        # 查询期间触发器被修改时，缓存失效代数会变化，此时不写入可能已过期的快照
+        generation = trigger_detail_cache.generation
+        with session_scope() as session:
+            trigger = session.get(Trigger, trigger_id)
+            if trigger is None:
+                return None
+            detail = TriggerDetail.from_trigger(trigger)
+        trigger_detail_cache.set_if_current(trigger_id, detail, generation)
+        return detail
     
     @staticmethod
     def update_trigger(
@@ -152,21 +253,20 @@ class TriggerService:
         Raises:
             ValueError: 当触发器不存在或Cron表达式无效时
         """
-        session = get_session()
-        try:
-            trigger = session.query(Trigger).filter(
-                Trigger.id == trigger_id
-            ).first()
+        # 不依赖数据库的校验先于打开会话完成，无效请求不占用连接
+        # 验证新的 Cron 表达式
+        if cron_expression:
+            _validate_cron(cron_expression)
+        if max_instances is not None and max_instances < 1:
+            raise ValueError("max_instances 必须大于等于 1")
+
+        with session_scope() as session:
+            trigger = session.get(Trigger, trigger_id)
 
             if not trigger:
                 raise ValueError(f"触发器 {trigger_id} 不存在")
 
-            # 验证新的 Cron 表达式
             if cron_expression:
-                try:
-                    CronTrigger.from_crontab(cron_expression)
-                except Exception as e:
-                    raise ValueError(f"无效的 Cron 表达式: {e}")
                 trigger.cron_expression = cron_expression
 
             if name:
@@ -174,29 +274,25 @@ class TriggerService:
             if description is not None:
                 trigger.description = description
             if trigger_params is not None:
-                trigger.trigger_params = json.dumps(trigger_params, ensure_ascii=False)
+                trigger.trigger_params = json.dumps(trigger_params, option=0)
             if max_instances is not None:
-                if max_instances < 1:
-                    raise ValueError("max_instances 必须大于等于 1")
                 trigger.max_instances = max_instances
 
             trigger.updated_at = datetime.now()
+            # 提交前移出会话，对象保留修改后的属性，提交后无需 refresh 重新查询
+            session.flush()
+            _detach(session, [trigger])
             session.commit()
-            session.refresh(trigger)
+            SchedulerService.invalidate_trigger(trigger.id)
+            trigger_detail_cache.pop(trigger.id)
 
-            # 重新加载调度任务
+            # 按变化的字段更新调度任务，只修改描述等不影响调度的字段时不改动调度器
             if trigger.enabled:
-                SchedulerService.add_job(
-                    trigger.id,
-                    trigger.flow_id,
-                    trigger.cron_expression,
-                    max_instances=trigger.max_instances
-                )
+                SchedulerService.refresh_trigger_job(trigger)
+            SchedulerService.notify_triggers_changed()
 
             logger.info(f"更新触发器成功: {trigger.id} - {trigger.name}, max_instances: {trigger.max_instances}")
             return trigger
-        finally:
-            session.close()
     
     @staticmethod
     def delete_trigger(trigger_id: int):
@@ -208,25 +304,22 @@ class TriggerService:
         Raises:
             ValueError: 当触发器不存在时
         """
-        session = get_session()
-        try:
-            trigger = session.query(Trigger).filter(
-                Trigger.id == trigger_id
-            ).first()
-            
-            if not trigger:
+        with session_scope() as session:
+            # 直接按ID删除，以影响行数判断触发器是否存在，无需先加载
+            deleted = session.execute(
+                delete(Trigger).where(Trigger.id == trigger_id)
+            ).rowcount
+            if not deleted:
                 raise ValueError(f"触发器 {trigger_id} 不存在")
-            
+            session.commit()
+
             # 从调度器移除
             SchedulerService.remove_job(trigger_id)
-            
-            # 从数据库删除
-            session.delete(trigger)
-            session.commit()
+            SchedulerService.invalidate_trigger(trigger_id)
+            trigger_detail_cache.pop(trigger_id)
+            SchedulerService.notify_triggers_changed()
             
             logger.info(f"删除触发器成功: {trigger_id}")
-        finally:
-            session.close()
     
     @staticmethod
     def toggle_trigger_status(trigger_id: int, enabled: bool):
@@ -239,25 +332,28 @@ class TriggerService:
         Raises:
             ValueError: 当触发器不存在时
         """
-        session = get_session()
-        try:
-            trigger = session.query(Trigger).filter(
-                Trigger.id == trigger_id
-            ).first()
-            
-            if not trigger:
+        with session_scope() as session:
+            # 以单条 UPDATE 修改状态，以影响行数判断触发器是否存在，无需先加载
+            updated = session.execute(
+                update(Trigger)
+                .where(Trigger.id == trigger_id)
+                .values(enabled=1 if enabled else 0, updated_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not updated:
                 raise ValueError(f"触发器 {trigger_id} 不存在")
-            
-            trigger.enabled = 1 if enabled else 0
-            trigger.updated_at = datetime.now()
             session.commit()
+            SchedulerService.invalidate_trigger(trigger_id)
+            trigger_detail_cache.pop(trigger_id)
             
-            # 更新调度器
-            if enabled:
-                SchedulerService.resume_job(trigger_id)
-            else:
-                SchedulerService.pause_job(trigger_id)
+            # 更新调度器；数据库已提交，以其为准，调度器更新失败时由随后唤醒的触发器同步修正
+            try:
+                if enabled:
+                    SchedulerService.resume_job(trigger_id)
+                else:
+                    SchedulerService.pause_job(trigger_id)
+            except Exception as e:
+                logger.warning(f"更新调度任务失败，等待触发器同步修正: {trigger_id}: {e}")
+            SchedulerService.notify_triggers_changed()
             
             logger.info(f"切换触发器状态成功: {trigger_id} - enabled={enabled}")
-        finally:
-            session.close()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Flowy Web工具函数"""
+
+import hashlib
+
+from flask import request
+
+
+def make_etag(*parts) -> str:
+    """根据版本信息生成ETag"""
+    return hashlib.blake2b(':'.join(map(str, parts)).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def is_not_modified(etag: str) -> bool:
+    """客户端缓存的ETag是否与当前一致"""
+    return request.if_none_match.contains(etag)
+
+
+def with_etag(response, etag: str):
+    """为响应设置ETag，并要求客户端每次使用前重新验证"""
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""测试公共夹具"""
+
+import pytest
+
+from flowy.core import config as flowy_config
+from flowy.core import db
+from flowy.core import migration_manager
+from flowy.core.cache import invalidate_flow_caches
+
+
+@pytest.fixture
+def flowy_db(tmp_path, monkeypatch):
+    """在临时数据目录中初始化数据库，测试结束后释放连接"""
+    monkeypatch.setattr(flowy_config, '_config', None)
+    flowy_config.configure(data_dir=str(tmp_path))
+    # 引擎与会话工厂按配置延迟创建，测试期间替换为指向临时目录的新实例
+    for name in ('_engine', '_history_engine', '_DBSession', '_ScopedSession'):
+        monkeypatch.setattr(db, name, None)
+    # 迁移管理器在创建时读取数据库路径，同样需要按临时配置重新创建
+    monkeypatch.setattr(migration_manager, '_migration_manager', None)
+    db.init_database()
+    invalidate_flow_caches()
+
+    yield db
+
+    invalidate_flow_caches()
+    for engine in (db._engine, db._history_engine):
+        if engine is not None:
+            engine.dispose()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""TTLCache 失效代数测试"""
+
+from flowy.core.cache import TTLCache
+
+
+def test_set_if_current_writes_when_not_invalidated():
+    cache = TTLCache(maxsize=4, ttl=60)
+    generation = cache.generation
+    assert cache.set_if_current('a', 1, generation)
+    assert cache.get('a') == 1
+
+
+def test_set_if_current_skips_after_pop():
+    cache = TTLCache(maxsize=4, ttl=60)
+    generation = cache.generation
+    # 读取数据源期间条目被修改并失效
+    cache.pop('a')
+    assert not cache.set_if_current('a', 'stale', generation)
+    assert cache.get('a') is None
+
+
+def test_set_if_current_skips_after_clear():
+    cache = TTLCache(maxsize=4, ttl=60)
+    generation = cache.generation
+    cache.clear()
+    assert not cache.set_if_current('a', 'stale', generation)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""FlowService 查询次数回归测试
+
+每个用例在多个Flow、多条执行历史的数据上统计一次调用执行的SQL语句数，
+语句数与数据量无关，出现N+1查询时测试失败。
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from flowy.core import db
+from flowy.core.cache import flow_stats_cache, invalidate_flow_caches
+from flowy.web.services.flow_service import FlowService
+
+FLOW_COUNT = 3
+HISTORY_PER_FLOW = 5
+TASKS_PER_HISTORY = 2
+
+
+@pytest.fixture
+def history_ids(flowy_db):
+    """写入测试数据，返回所有执行历史ID"""
+    ids = []
+    session = db.get_session()
+    try:
+        now = datetime.now()
+        for i in range(FLOW_COUNT):
+            flow_id = f'flow_{i}'
+            db.register_flow(session, flow_id, f'Flow {i}')
+            for j in range(HISTORY_PER_FLOW):
+                created_at = now - timedelta(hours=j)
+                history = db.create_flow_history(
+                    session, flow_id, created_at,
+                    start_time=created_at, end_time=created_at + timedelta(seconds=5),
+                    status='completed' if j % 2 == 0 else 'failed'
+                )
+                session.flush()
+                ids.append(history.id)
+                for k in range(TASKS_PER_HISTORY):
+                    db.create_task_history(
+                        session, history.id, f'task_{k}', created_at,
+                        start_time=created_at, end_time=created_at + timedelta(seconds=1),
+                        status='completed'
+                    )
+        session.commit()
+    finally:
+        session.close()
+
+    invalidate_flow_caches()
+    return ids
+
+
+def test_get_all_flows_with_stats(history_ids):
+    flow_stats_cache.clear()
+    with db.count_queries() as statements:
+        flows = FlowService.get_all_flows_with_stats()
+    assert len(flows) == FLOW_COUNT
+    assert len(statements) <= 3, statements
+
+
+def test_get_flow_history_paginated(history_ids):
+    with db.count_queries() as statements:
+        histories, _ = FlowService.get_flow_history_paginated('flow_0', page=1, per_page=30)
+    assert len(histories) == HISTORY_PER_FLOW
+    assert len(statements) <= 4, statements
+
+
+def test_batch_delete_flow_history(history_ids):
+    with db.count_queries() as statements:
+        success, failed = FlowService.batch_delete_flow_history(history_ids)
+    assert (success, failed) == (len(history_ids), 0)
+    assert len(statements) <= 2, statements
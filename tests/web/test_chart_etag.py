@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Flow图表数据接口的协商缓存测试"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from flowy.web import create_app
+from flowy.web.services import flow_service
+
+
+class _FrozenDatetime(datetime):
+    """now() 返回可调整的固定时间"""
+    current = datetime(2026, 10, 16, 23, 30)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def client(flowy_db, monkeypatch):
+    session = flowy_db.get_session()
+    try:
+        flowy_db.register_flow(session, 'flow_0', 'Flow 0')
+        created_at = _FrozenDatetime.current - timedelta(hours=1)
+        flowy_db.create_flow_history(
+            session, 'flow_0', created_at,
+            start_time=created_at, end_time=created_at + timedelta(seconds=5), status='completed'
+        )
+        session.commit()
+    finally:
+        session.close()
+
+    monkeypatch.setattr(flow_service, 'datetime', _FrozenDatetime)
+    return create_app().test_client()
+
+
+def _get_chart(client, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get('/api/flows/flow_0/chart-data?days=7', headers=headers)
+
+
+def test_chart_not_modified_within_same_hour(client, monkeypatch):
+    first = _get_chart(client)
+    assert first.status_code == 200
+
+    monkeypatch.setattr(_FrozenDatetime, 'current', _FrozenDatetime.current + timedelta(minutes=20))
+    assert _get_chart(client, first.headers['ETag']).status_code == 304
+
+
+def test_chart_regenerated_after_clock_advances(client, monkeypatch):
+    first = _get_chart(client)
+    assert first.status_code == 200
+
+    # 跨过零点：按日统计的日期轴整体后移
+    monkeypatch.setattr(_FrozenDatetime, 'current', _FrozenDatetime.current + timedelta(hours=1))
+    second = _get_chart(client, first.headers['ETag'])
+    assert second.status_code == 200
+    first_dates = first.get_json()['data']['daily_trend']['dates']
+    second_dates = second.get_json()['data']['daily_trend']['dates']
+    assert second_dates[:-1] == first_dates[1:]
+    assert second_dates[-1] == '2026-10-17'
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""即时任务历史记录写入线程的超时取消测试"""
+
+from concurrent import futures
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from flowy.web.services import scheduler_service
+from flowy.web.services.scheduler_service import SchedulerService, _PendingHistoryWriter
+
+
+def _history_count(db):
+    with db.session_scope() as session:
+        return session.scalar(select(func.count(db.FlowHistory.id)))
+
+
+@pytest.fixture
+def stalled_writer(flowy_db, monkeypatch):
+    """不启动写入线程的写入器，请求停留在队列中，由测试手动取出写入"""
+    writer = _PendingHistoryWriter()
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+    monkeypatch.setattr(scheduler_service, '_history_writer', writer)
+    return writer
+
+
+def _row(flow_id='flow_0'):
+    return {'flow_id': flow_id, 'status': 'pending', 'input_data': b'{}', 'created_at': datetime.now()}
+
+
+def test_writer_returns_new_history_id(flowy_db, stalled_writer):
+    future = stalled_writer.submit(_row())
+    stalled_writer._write(stalled_writer._take_batch())
+    assert future.result(timeout=1) > 0
+    assert _history_count(flowy_db) == 1
+
+
+def test_cancelled_request_is_not_written(flowy_db, stalled_writer):
+    cancelled = stalled_writer.submit(_row())
+    kept = stalled_writer.submit(_row())
+    assert cancelled.cancel()
+
+    stalled_writer._write(stalled_writer._take_batch())
+    assert kept.result(timeout=1) > 0
+    assert _history_count(flowy_db) == 1
+
+
+def test_add_immediate_job_timeout_leaves_no_pending_history(flowy_db, stalled_writer, monkeypatch):
+    monkeypatch.setattr(scheduler_service, '_HISTORY_WRITE_TIMEOUT', 0.01)
+    # 已有调度器时 add_immediate_job 不会初始化或启动调度器
+    monkeypatch.setattr(SchedulerService, '_scheduler', object())
+
+    with pytest.raises(futures.TimeoutError):
+        SchedulerService.add_immediate_job('flow_0', delay_seconds=0)
+
+    # 超时后写入线程才取出请求，已取消的请求不再写入
+    stalled_writer._write(stalled_writer._take_batch())
+    assert _history_count(flowy_db) == 0